@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark analizy meczow: MatchAnalyzer.analyze (petla) vs analyze_batch.
+Sprawdza tez, czy obie sciezki daja identyczne wyniki.
+
+Uzycie:
+  python benchmarks/bench_analyze_batch.py                      - 10k, 100k i 1M meczow
+  python benchmarks/bench_analyze_batch.py --fixtures 50000     - wlasny rozmiar
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from betting_tips_agent import League, Match, MatchAnalyzer, TeamStats, np  # noqa: E402
+
+# Mecze przetwarzane porcjami - 1M wynikow naraz nie miesci sie wygodnie w RAM
+CHUNK = 50_000
+
+
+def generate_teams(rng: random.Random, count: int = 60) -> list:
+    teams = []
+    for i in range(count):
+        played = rng.randint(5, 38)
+        wins = rng.randint(0, played)
+        draws = rng.randint(0, played - wins)
+        teams.append(TeamStats(
+            name=f"Team {i}",
+            position=rng.randint(1, 20),
+            played=played,
+            wins=wins,
+            draws=draws,
+            losses=played - wins - draws,
+            goals_for=rng.randint(played // 2, played * 3),
+            goals_against=rng.randint(played // 2, played * 3),
+            form=[rng.choice("WDL") for _ in range(5)],
+            injuries=[f"P{j}" for j in range(rng.randint(0, 5))],
+        ))
+    return teams
+
+
+def generate_matches(rng: random.Random, teams: list, count: int):
+    leagues = list(League)
+    for i in range(count):
+        home, away = rng.sample(teams, 2)
+        has_h2h = rng.random() < 0.7
+        yield Match(
+            id=f"m{i}",
+            league=rng.choice(leagues),
+            home_team=home,
+            away_team=away,
+            kickoff=datetime(2026, 1, 1),
+            # Czesc meczow bez kursow - sprawdza galezie "odds == 0"
+            odds_home=round(rng.uniform(1.2, 6.0), 2) if rng.random() < 0.95 else 0.0,
+            odds_draw=round(rng.uniform(2.5, 5.0), 2),
+            odds_away=round(rng.uniform(1.2, 8.0), 2),
+            odds_btts_yes=round(rng.uniform(1.4, 2.6), 2) if rng.random() < 0.9 else 0.0,
+            odds_over_25=round(rng.uniform(1.4, 2.8), 2),
+            h2h_home_wins=rng.randint(0, 5) if has_h2h else 0,
+            h2h_draws=rng.randint(0, 3) if has_h2h else 0,
+            h2h_away_wins=rng.randint(0, 5) if has_h2h else 0,
+            h2h_total_goals=round(rng.uniform(1.0, 4.5), 1) if has_h2h else 0.0,
+        )
+
+
+def bench(count: int):
+    rng = random.Random(42)
+    teams = generate_teams(rng)
+    analyzer = MatchAnalyzer()
+
+    scalar = batch = 0.0
+    done = 0
+    while done < count:
+        matches = list(generate_matches(rng, teams, min(CHUNK, count - done)))
+
+        # Jak timeit - bez GC w pomiarze (przy tylu obiektach to on dominowal)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            expected = [analyzer.analyze(match) for match in matches]
+            scalar += time.perf_counter() - start
+
+            start = time.perf_counter()
+            results = analyzer.analyze_batch(matches)
+            batch += time.perf_counter() - start
+        finally:
+            gc.enable()
+
+        if results != expected:
+            raise AssertionError("analyze_batch rozni sie od analyze")
+        done += len(matches)
+
+    print(f"  {count:>10,} {scalar:>12.2f} s {batch:>12.2f} s {scalar / batch:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    if np is None:
+        print("  Brak NumPy - analyze_batch uzywa sciezki skalarnej")
+    print(f"  {'mecze':>10} {'analyze':>14} {'analyze_batch':>14} {'x':>8}")
+    for count in args.fixtures:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark zapytan historii typow (get_stats / get_recent_tips)
+z indeksami i bez nich.
+
+Uzycie:
+  python benchmarks/bench_db_queries.py                    - 1M i 10M wierszy
+  python benchmarks/bench_db_queries.py --rows 100000      - wlasny rozmiar
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from betting_tips_agent import Database, BetType, League  # noqa: E402
+
+INDEXES = [
+    "idx_tips_settled",
+    "idx_tips_league_settled",
+    "idx_tips_bet_type_settled",
+    "idx_tips_window_cells",
+    "idx_tips_created_at",
+]
+
+
+MATCHES = 5000
+
+
+def generate_rows(count: int, match_leagues: list, days: int = 5 * 365):
+    """Losowe wiersze tips rozlozone na `days` dni wstecz"""
+    rng = random.Random(42)
+    codes = [bet_type.code for bet_type in BetType]
+    start = datetime.now() - timedelta(days=days)
+    step = days * 86400 / count
+
+    for i in range(count):
+        ts = start + timedelta(seconds=i * step)
+        odds = round(rng.uniform(1.4, 3.5), 2)
+        r = rng.random()
+        if r < 0.05:
+            result, profit = None, None
+        elif r < 0.5:
+            result, profit = "WIN", round(10 * (odds - 1), 2)
+        else:
+            result, profit = "LOSS", -10.0
+        match_id = rng.randrange(1, MATCHES + 1)
+        yield (
+            ts.strftime("%Y-%m-%d"),
+            match_leagues[match_id],
+            match_id,
+            rng.choice(codes),
+            odds,
+            10.0,
+            round(rng.uniform(0.65, 0.85), 3),
+            round(rng.uniform(0.05, 0.2), 3),
+            "[]",
+            result,
+            profit,
+            ts.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+
+def populate(db: Database, count: int):
+    rng = random.Random(7)
+    with db.transaction() as conn:
+        # Wymiary: ligi, po 20 druzyn na lige, MATCHES meczow
+        match_leagues = [None]
+        for league in League:
+            league_id = conn.execute("INSERT INTO leagues (name) VALUES (?)", (league.league_name,)).lastrowid
+            for i in range(20):
+                conn.execute("INSERT INTO teams (league_id, name) VALUES (?, ?)", (league_id, f"Team {i}"))
+        for match_id in range(1, MATCHES + 1):
+            league_id = rng.randrange(1, len(League) + 1)
+            home, away = rng.sample(range(20), 2)
+            base = (league_id - 1) * 20 + 1
+            conn.execute('''
+                INSERT INTO matches (id, league_id, home_team_id, away_team_id, match_date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (match_id, league_id, base + home, base + away, f"m{match_id}"))
+            match_leagues.append(league_id)
+
+        conn.executemany('''
+            INSERT INTO tips (date, league_id, match_id, bet_type, odds, stake, confidence,
+                              value, reasoning, result, profit, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', generate_rows(count, match_leagues))
+
+
+def timeit(func, repeat: int = 5) -> float:
+    """Najlepszy czas z `repeat` prob, w ms"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_queries(db: Database) -> dict:
+    def cold(query):
+        # Mierzymy SQL, nie cache wynikow
+        def run():
+            db.clear_stats_cache()
+            query()
+        return run
+
+    return {
+        "get_stats(30)": timeit(cold(lambda: db.get_stats(30))),
+        "get_stats(365)": timeit(cold(lambda: db.get_stats(365))),
+        "get_stats(30, league)": timeit(cold(lambda: db.get_stats(30, league="Serie A"))),
+        "get_stats(30, bet_type)": timeit(cold(lambda: db.get_stats(30, bet_type="O2.5"))),
+        "get_stats_matrix()": timeit(cold(db.get_stats_matrix)),
+        "get_recent_tips(10)": timeit(lambda: db.get_recent_tips(10)),
+    }
+
+
+def bench(count: int):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        db = Database(path, profile="fast")
+        with db.connection() as conn:
+            for name in INDEXES:
+                conn.execute(f"DROP INDEX {name}")
+
+        start = time.perf_counter()
+        populate(db, count)
+        print(f"\n  {count:,} wierszy (wstawianie: {time.perf_counter() - start:.1f} s)")
+
+        without = run_queries(db)
+
+        start = time.perf_counter()
+        db.close()
+        db = Database(path, profile="fast")     # odtwarza indeksy
+        with db.connection() as conn:
+            conn.execute("ANALYZE")
+        print(f"  budowa indeksow: {time.perf_counter() - start:.1f} s")
+
+        with_idx = run_queries(db)
+        db.close()
+
+        print(f"  {'zapytanie':<26}{'bez indeksu':>14}{'z indeksem':>14}{'x':>8}")
+        for name, ms in without.items():
+            fast = with_idx[name]
+            print(f"  {name:<26}{ms:>11.2f} ms{fast:>11.2f} ms{ms / max(fast, 1e-6):>8.0f}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    for count in args.rows:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
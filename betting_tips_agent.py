@@ -11,17 +11,41 @@ Wybrane ligi:
 
 Autor: Claude AI
 Stawka: 10 zl / typ
+Wymaga: Python 3.10+ (dataclass slots=True), numpy opcjonalnie
 """
 
+import csv
+import functools
+import heapq
+import itertools
 import json
+import os
+import queue
 import sqlite3
+import stat
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from urllib.request import pathname2url
 from datetime import datetime, timedelta
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, asdict, astuple
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, NamedTuple, Callable
 from enum import Enum
 import random
 import math
 
+if sys.version_info < (3, 10):
+    raise ImportError("betting_tips_agent wymaga Pythona 3.10+ (dataclass slots=True)")
+
+try:
+    import numpy as np
+except ImportError:  # opcjonalne - analyze_batch liczy wtedy skalarnie
+    np = None
+
 # ============================================
 # KONFIGURACJA
 # ============================================
@@ -54,6 +78,10 @@ class BetType(Enum):
         self.code = code
         self.description = description
 
+    # Skladowe to singletony - hash wg id zamiast Enum.__hash__ (liczonego w Pythonie).
+    # BetType jest kluczem w slowniku wynikow kazdej analizy i wyceny
+    __hash__ = object.__hash__
+
 
 CONFIG = {
     "unit_size": 10,           # PLN na typ
@@ -62,6 +90,29 @@ CONFIG = {
     "min_value": 0.05,         # Min 5% value
     "min_odds": 1.40,
     "max_odds": 3.50,
+    "db_shard_by": None,       # None / "month" / "season" - shardy historii typow
+    "models": {"heuristic": 1.0},  # ANALYZERS: nazwa -> waga (kilka = EnsembleAnalyzer)
+    "model_workers": None,     # procesy EnsembleAnalyzer (None - liczba CPU, 0/1 - bez puli)
+}
+
+# Profile PRAGMA dla bazy historii (WAL: odczyty nie blokuja zapisu)
+PRAGMA_PROFILES = {
+    # Bezpieczny: fsync przy kazdym commicie
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,        # ~8 MB
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    # Szybki: fsync tylko przy checkpoincie WAL
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,       # ~64 MB
+        "mmap_size": 268435456,     # 256 MB
+        "temp_store": "MEMORY",
+    },
 }
 
 
@@ -69,7 +120,7 @@ CONFIG = {
 # STRUKTURY DANYCH
 # ============================================
 
-@dataclass
+@dataclass(slots=True)
 class TeamStats:
     """Statystyki druzyny"""
     name: str
@@ -111,8 +162,238 @@ class TeamStats:
         # Przyblizenie na podstawie strzelonych/straconych
         return max(0, 1 - (self.goals_against / self.played / 2))
 
+    @property
+    def version(self) -> Tuple:
+        """Wersja statystyk uzywanych przez analize - zmienia sie tylko ze zmiana danych"""
+        return (self.name, self.position, self.played, self.goals_for, self.goals_against,
+                tuple(self.form[-5:]), len(self.injuries))
+
+
+# Kodowanie formy: 2 bity na wynik, najnowszy w najmlodszych bitach, 0 = brak meczu
+FORM_CODES = {'W': 1, 'D': 2, 'L': 3}
+FORM_RESULTS = ('', 'W', 'D', 'L')
+FORM_POINTS = (0, 3, 1, 0)
+# Ile wynikow miesci sie w jednej komorce kolumny formy (array 'I')
+FORM_SLOTS = array('I').itemsize * 4
+# Wynik formy dla kazdego kodu ostatnich 5 meczow (10 bitow)
+FORM_SCORES = tuple(
+    sum(FORM_POINTS[(code >> 2 * i) & 3] for i in range(5)) / 15 if code else 0.5
+    for code in range(1 << 10)
+)
+
+
+def encode_form(results: Iterable[str]) -> int:
+    """
+    Pakuje forme ['W','D','L',...] w int (ostatnie FORM_SLOTS wynikow).
+    Nieznana litera to mecz za 0 pkt (jak w TeamStats.form_score) - zapisywana jako 'L'
+    """
+    code = 0
+    for r in list(results)[-FORM_SLOTS:]:
+        code = (code << 2) | FORM_CODES.get(r, FORM_CODES['L'])
+    return code
+
+
+def decode_form(code: int) -> List[str]:
+    """Odwrotnosc encode_form"""
+    form = []
+    while code:
+        form.append(FORM_RESULTS[code & 3])
+        code >>= 2
+    form.reverse()
+    return form
+
+
+class TeamTable:
+    """Druzyny jako kolumny (struct of arrays) - jeden wiersz na druzyne w lidze"""
+
+    __slots__ = ("names", "leagues", "injuries", "position", "played", "wins", "draws",
+                 "losses", "goals_for", "goals_against", "points", "form", "home_form",
+                 "away_form", "_index")
+
+    INT_COLUMNS = ("position", "played", "wins", "draws", "losses",
+                   "goals_for", "goals_against", "points")
+    FORM_COLUMNS = ("form", "home_form", "away_form")
 
-@dataclass
+    def __init__(self):
+        self.names: List[str] = []
+        self.leagues: List[League] = []
+        self.injuries: List[Tuple[str, ...]] = []
+        for column in self.INT_COLUMNS:
+            setattr(self, column, array('i'))
+        for column in self.FORM_COLUMNS:
+            setattr(self, column, array('I'))
+        self._index: Dict[Tuple[League, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, league: League, team: TeamStats) -> int:
+        """Dodaje (lub nadpisuje) druzyne, zwraca numer wiersza"""
+        row = self._index.get((league, team.name))
+        if row is None:
+            row = len(self.names)
+            self._index[(league, team.name)] = row
+            self.names.append(team.name)
+            self.leagues.append(league)
+            self.injuries.append(())
+            for column in self.INT_COLUMNS + self.FORM_COLUMNS:
+                getattr(self, column).append(0)
+        self.update(row, **{column: getattr(team, column)
+                            for column in self.INT_COLUMNS + self.FORM_COLUMNS + ("injuries",)})
+        return row
+
+    def update(self, row: int, **values):
+        """Zmienia kolumny wiersza; forma jako lista wynikow"""
+        for column, value in values.items():
+            if column in self.FORM_COLUMNS:
+                value = encode_form(value)
+            elif column == "injuries":
+                value = tuple(value)
+            elif column not in self.INT_COLUMNS:
+                raise KeyError(column)
+            getattr(self, column)[row] = value
+
+    def find(self, league: League, name: str) -> Optional[int]:
+        return self._index.get((league, name))
+
+    def rows(self, league: League) -> List[int]:
+        return [row for row, team_league in enumerate(self.leagues) if team_league is league]
+
+    def view(self, row: int) -> "TeamView":
+        return TeamView(self, row)
+
+
+class TeamView:
+    """Widok wiersza TeamTable z API TeamStats (tylko odczyt)"""
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: TeamTable, row: int):
+        self.table = table
+        self.row = row
+
+    name = property(lambda self: self.table.names[self.row])
+    position = property(lambda self: self.table.position[self.row])
+    played = property(lambda self: self.table.played[self.row])
+    wins = property(lambda self: self.table.wins[self.row])
+    draws = property(lambda self: self.table.draws[self.row])
+    losses = property(lambda self: self.table.losses[self.row])
+    goals_for = property(lambda self: self.table.goals_for[self.row])
+    goals_against = property(lambda self: self.table.goals_against[self.row])
+    points = property(lambda self: self.table.points[self.row])
+    form = property(lambda self: decode_form(self.table.form[self.row]))
+    home_form = property(lambda self: decode_form(self.table.home_form[self.row]))
+    away_form = property(lambda self: decode_form(self.table.away_form[self.row]))
+    injuries = property(lambda self: list(self.table.injuries[self.row]))
+
+    @property
+    def form_score(self) -> float:
+        return FORM_SCORES[self.table.form[self.row] & 0x3FF]
+
+    goals_per_game = TeamStats.goals_per_game
+    conceded_per_game = TeamStats.conceded_per_game
+    clean_sheet_rate = TeamStats.clean_sheet_rate
+
+    @property
+    def version(self) -> Tuple:
+        table, row = self.table, self.row
+        return (table.names[row], table.position[row], table.played[row],
+                table.goals_for[row], table.goals_against[row],
+                table.form[row] & 0x3FF, len(table.injuries[row]))
+
+    def to_stats(self) -> TeamStats:
+        """Niezalezna kopia jako TeamStats"""
+        return TeamStats(name=self.name, injuries=self.injuries,
+                         **{column: getattr(self, column)
+                            for column in TeamTable.INT_COLUMNS + TeamTable.FORM_COLUMNS})
+
+    def __reduce__(self):
+        # Pickle (np. do procesow EnsembleAnalyzer) - sam wiersz jako TeamStats, bez tabeli
+        return TeamStats, astuple(self.to_stats())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TeamView) and other.table is self.table:
+            return other.row == self.row
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self.table), self.row))
+
+    def __repr__(self) -> str:
+        return f"TeamView({self.name!r}, row={self.row})"
+
+
+class Market(NamedTuple):
+    """
+    Rynek parametryczny: rodzaj + linia co 0.25. Linia .5 - zwykla; calkowita -
+    zwrot stawki przy rownej; .25/.75 (azjatycka) - polowa stawki na dwie sasiednie.
+    Ten sam opis (spec) sluzy do wyceny z ScoreMatrix i do rozliczenia.
+    """
+    kind: str
+    line: float
+
+    # rodzaj -> (statystyka wyniku, znak, prefiks kodu, opis)
+    # wygrana, gdy znak * (statystyka - prog) > 0; AH gospodarzy: prog = -linia
+    KINDS = {
+        "over": ("total", 1, "O", "Powyzej {0:g} gola"),
+        "under": ("total", -1, "U", "Ponizej {0:g} gola"),
+        "ah_home": ("diff", 1, "AH1", "Handicap azjatycki gospodarzy {0:+g}"),
+        "ah_away": ("diff", -1, "AH2", "Handicap azjatycki gosci {0:+g}"),
+        "home_over": ("home", 1, "TT1O", "Gospodarze powyzej {0:g} gola"),
+        "home_under": ("home", -1, "TT1U", "Gospodarze ponizej {0:g} gola"),
+        "away_over": ("away", 1, "TT2O", "Goscie powyzej {0:g} gola"),
+        "away_under": ("away", -1, "TT2U", "Goscie ponizej {0:g} gola"),
+    }
+
+    @property
+    def code(self) -> str:
+        _, _, prefix, _ = self.KINDS[self.kind]
+        return f"{prefix}{self.line:+g}" if self.kind.startswith("ah") else f"{prefix}{self.line:g}"
+
+    @property
+    def description(self) -> str:
+        return self.KINDS[self.kind][3].format(self.line)
+
+    @classmethod
+    def parse(cls, code: str) -> Optional["Market"]:
+        """Market z kodu (np. 'O2.75', 'AH1-0.25'); None - to nie jest kod rynku"""
+        # Najdluzsze prefiksy najpierw ('TT1O' przed 'O')
+        for kind, (_, _, prefix, _) in sorted(cls.KINDS.items(), key=lambda item: -len(item[1][2])):
+            if code.startswith(prefix):
+                try:
+                    market = cls(kind, float(code[len(prefix):]))
+                except ValueError:
+                    return None
+                return market if (market.line * 4).is_integer() else None
+        return None
+
+    def spec(self) -> Tuple[str, int, Tuple[float, ...]]:
+        """(statystyka, znak, progi) - linia azjatycka to dwa progi po pol stawki"""
+        stat, sign, _, _ = self.KINDS[self.kind]
+        line = self.line
+        lines = (line - 0.25, line + 0.25) if (line * 2) % 1 else (line,)
+        if self.kind == "ah_home":
+            lines = tuple(-part for part in lines)
+        return stat, sign, lines
+
+    def settle(self, home_goals: int, away_goals: int) -> str:
+        """'WIN' / 'HALF_WIN' / 'VOID' / 'HALF_LOSS' / 'LOSS'"""
+        stat, sign, lines = self.spec()
+        value = {"total": home_goals + away_goals, "diff": home_goals - away_goals,
+                 "home": home_goals, "away": away_goals}[stat]
+        outcomes = [sign * (value - threshold) for threshold in lines]
+        wins = sum(margin > 0 for margin in outcomes) / len(lines)
+        pushes = sum(margin == 0 for margin in outcomes) / len(lines)
+        if wins == 1:
+            return "WIN"
+        if pushes == 1:
+            return "VOID"
+        if wins:
+            return "HALF_WIN"
+        return "HALF_LOSS" if pushes else "LOSS"
+
+
+@dataclass(slots=True)
 class Match:
     """Mecz do analizy"""
     id: str
@@ -139,24 +420,134 @@ class Match:
     result_home: Optional[int] = None
     result_away: Optional[int] = None
 
+    # Kursy rynkow parametrycznych (dowolne linie, handicapy, gole druzyn)
+    markets: Dict[Market, float] = field(default_factory=dict)
+
     def __str__(self):
         return f"{self.home_team.name} vs {self.away_team.name}"
 
 
+# Rynki z kursami w Match (BetType.code -> pole) - zapisywane w historii kursow
+ODDS_MARKETS = {
+    BetType.HOME_WIN.code: "odds_home",
+    BetType.DRAW.code: "odds_draw",
+    BetType.AWAY_WIN.code: "odds_away",
+    BetType.BTTS_YES.code: "odds_btts_yes",
+    BetType.OVER_25.code: "odds_over_25",
+}
+
+
+class OddsTick(NamedTuple):
+    """Jeden odczyt kursu z historii"""
+    market: str
+    ts: datetime
+    odds: float
+
+
+# Szablony uzasadnien typow (klucz -> tekst z parametrami str.format)
+REASON_TEMPLATES = {
+    "form_home": "Lepsza forma: {0:.0%} vs {1:.0%}",
+    "form_away": "Lepsza forma gosci: {0:.0%}",
+    "home_advantage": "Przewaga wlasnego boiska",
+    "position_home": "Wyzsza pozycja w tabeli ({0} vs {1})",
+    "position_away": "Wyzsza pozycja gosci ({0})",
+    "rating_home": "Wyzszy ranking Elo ({0:.0f} vs {1:.0f})",
+    "rating_away": "Wyzszy ranking Elo gosci ({0:.0f})",
+    "h2h_home": "Korzystne H2H: {0}W-{1}D-{2}L",
+    "h2h_away": "Korzystne H2H dla gosci",
+    "goal_diff_home": "Lepszy bilans bramkowy: {0:+.1f} vs {1:+.1f}",
+    "goal_diff_away": "Lepszy bilans bramkowy gosci",
+    "injuries_home": "Kontuzje gospodarzy: {0} graczy",
+    "injuries_away": "Kontuzje gosci: {0} graczy",
+    "draw_form": "Wyrownane formy druzyn",
+    "draw_position": "Podobne pozycje w tabeli",
+    "draw_rating": "Zblizone rankingi Elo",
+    "draw_cover": "Zabezpieczenie remisem",
+    "team_scores": "{0} strzela srednio {1:.1f} gola/mecz",
+    "team_concedes": "{0} traci srednio {1:.1f} gola/mecz",
+    "btts_no": "Slabe ataki lub mocne obrony",
+    "h2h_goals": "Srednio {0:.1f} goli w H2H",
+    "high_goals": "Wysoka srednia goli: {0:.1f}",
+    "attacking_teams": "Ofensywne druzyny: {0:.1f} + {1:.1f} goli/mecz",
+    "under": "Defensywne nastawienie druzyn",
+    "over_35": "Bardzo ofensywne druzyny",
+    "expected_goals": "Model Poissona: oczekiwane gole {0:.2f} - {1:.2f}",
+    "elo_expected": "Ranking Elo {0:.0f} vs {1:.0f} - oczekiwany wynik {2:.0%}",
+}
+
+
+class Reason(NamedTuple):
+    """Uzasadnienie typu: klucz szablonu + parametry (tekst dopiero przy str())"""
+    key: str
+    params: Tuple = ()
+
+    def __str__(self):
+        return REASON_TEMPLATES[self.key].format(*self.params)
+
+
+class LazyReasons:
+    """
+    Lista powodow budowana dopiero przy pierwszym odczycie - build(*args).
+    Wiekszosc kandydatow odpada w filtrach TipGenerator i nikt ich powodow nie czyta.
+    """
+
+    __slots__ = ("_build", "_args", "_items")
+
+    def __init__(self, build: Callable[..., List[Reason]], *args):
+        self._build = build
+        self._args = args
+        self._items: Optional[List[Reason]] = None
+
+    def materialize(self) -> List[Reason]:
+        if self._items is None:
+            self._items = list(self._build(*self._args))
+            self._build = self._args = None
+        return self._items
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __len__(self) -> int:
+        return len(self.materialize())
+
+    def __getitem__(self, index):
+        return self.materialize()[index]
+
+    def __add__(self, other) -> List[Reason]:
+        return self.materialize() + list(other)
+
+    def __radd__(self, other) -> List[Reason]:
+        return list(other) + self.materialize()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LazyReasons):
+            other = other.materialize()
+        return self.materialize() == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Kopia/pickle to juz gotowa lista (bez analizatora i meczu)
+        return list, (self.materialize(),)
+
+    def __repr__(self) -> str:
+        return repr(self.materialize())
+
+
 @dataclass
 class BettingTip:
     """Wygenerowany typ"""
     match: Match
-    bet_type: BetType
+    bet_type: BetType  # albo Market (rynek parametryczny)
     odds: float
     confidence: float  # 0-1
     value: float       # % przewagi nad bukmacherem
     stake: float       # PLN
-    reasoning: List[str]
+    reasoning: List[Reason]  # albo LazyReasons / gotowe teksty (str)
     timestamp: datetime = field(default_factory=datetime.now)
 
     # Wynik (po rozliczeniu)
-    result: Optional[str] = None  # 'WIN', 'LOSS', 'VOID'
+    result: Optional[str] = None  # 'WIN', 'LOSS', 'VOID' (+ 'HALF_WIN', 'HALF_LOSS' - linie azjatyckie)
     profit: Optional[float] = None
 
     @property
@@ -177,43 +568,503 @@ class BettingTip:
         return "[NISKI]"
 
 
+class TipRow(NamedTuple):
+    """Lekki wiersz historii typow (z iter_tips)"""
+    id: int
+    created_at: str
+    date: str
+    league: str
+    match: str
+    bet_type: str
+    odds: float
+    stake: float
+    confidence: float
+    result: Optional[str]
+    profit: Optional[float]
+    reasoning: Optional[str] = None  # zapis z bazy - Database.decode_reasoning
+
+    @property
+    def cursor(self) -> Tuple[str, int]:
+        """Pozycja do wznowienia iter_tips (after_cursor)"""
+        return (self.created_at, self.id)
+
+
+@dataclass
+class TipFilter:
+    """Filtr historii typow"""
+    league: Optional[str] = None
+    bet_type: Optional[str] = None     # BetType.code
+    since: Optional[str] = None        # YYYY-MM-DD (wlacznie)
+    until: Optional[str] = None        # YYYY-MM-DD (wlacznie)
+    settled: Optional[bool] = None     # True = rozliczone, False = oczekujace
+
+    def to_sql(self) -> Tuple[List[str], List]:
+        where, params = [], []
+        if self.league is not None:
+            where.append("league = ?")
+            params.append(self.league)
+        if self.bet_type is not None:
+            where.append("bet_type = ?")
+            params.append(self.bet_type)
+        if self.since is not None:
+            where.append("date >= ?")
+            params.append(self.since)
+        if self.until is not None:
+            where.append("date <= ?")
+            params.append(self.until)
+        if self.settled is not None:
+            where.append("result IS NOT NULL" if self.settled else "result IS NULL")
+        return where, params
+
+
+# ============================================
+# ROZLICZANIE
+# ============================================
+
+# Czy typ wygral przy wyniku (gole gospodarzy, gole gosci)
+BET_OUTCOMES = {
+    BetType.HOME_WIN.code: lambda h, a: h > a,
+    BetType.DRAW.code: lambda h, a: h == a,
+    BetType.AWAY_WIN.code: lambda h, a: h < a,
+    BetType.HOME_OR_DRAW.code: lambda h, a: h >= a,
+    BetType.AWAY_OR_DRAW.code: lambda h, a: h <= a,
+    BetType.BTTS_YES.code: lambda h, a: h > 0 and a > 0,
+    BetType.BTTS_NO.code: lambda h, a: h == 0 or a == 0,
+    BetType.OVER_25.code: lambda h, a: h + a > 2.5,
+    BetType.OVER_35.code: lambda h, a: h + a > 3.5,
+    BetType.UNDER_25.code: lambda h, a: h + a < 2.5,
+}
+
+
+def parse_score(score) -> Tuple[int, int]:
+    """Wynik jako (2, 1) albo tekst '2:1' / '2-1'"""
+    if isinstance(score, str):
+        home, away = score.replace("-", ":").split(":")
+        return int(home), int(away)
+    home, away = score
+    return int(home), int(away)
+
+
+def settle_bet(bet_code: str, home_goals: int, away_goals: int) -> Optional[str]:
+    """
+    Rozlicza typ po wyniku meczu: 'WIN' / 'LOSS', dla rynkow parametrycznych
+    (Market) takze 'VOID' / 'HALF_WIN' / 'HALF_LOSS' (None = nieznany typ)
+    """
+    outcome = BET_OUTCOMES.get(bet_code)
+    if outcome is None:
+        market = Market.parse(bet_code)
+        return market.settle(home_goals, away_goals) if market else None
+    return "WIN" if outcome(home_goals, away_goals) else "LOSS"
+
+
+# Wyniki rozliczonego typu (polowki i VOID - linie azjatyckie / rynki parametryczne)
+RESULTS = ("WIN", "HALF_WIN", "VOID", "HALF_LOSS", "LOSS")
+
+
+def calculate_profit(result: str, odds: float, stake: float) -> float:
+    """Zysk netto z rozliczonego typu"""
+    if result == "WIN":
+        return stake * (odds - 1)
+    if result == "HALF_WIN":
+        return stake * (odds - 1) / 2
+    if result == "LOSS":
+        return -stake
+    if result == "HALF_LOSS":
+        return -stake / 2
+    return 0.0
+
+
 # ============================================
 # BAZA DANYCH
 # ============================================
 
+class ConnectionPool:
+    """
+    Pula polaczen SQLite bezpieczna dla watkow (checkout/checkin).
+    Najwyzej max_size polaczen naraz - kolejne watki czekaja na zwolnienie.
+    Zagniezdzone pobranie w tym samym watku zwraca to samo polaczenie.
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection],
+                 max_size: int = 5, timeout: float = 30.0):
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            # Zagniezdzone uzycie w tym samym watku
+            yield conn
+            return
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Brak wolnego polaczenia w puli ({self.max_size}) po {self.timeout}s")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self.factory()
+                with self._lock:
+                    self._all.append(conn)
+
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[List[sqlite3.Connection]]:
+        """
+        Czeka, az wszystkie polaczenia wroca do puli, i trzyma je na czas bloku.
+        Nie wolno wolac z watku, ktory sam ma pobrane polaczenie.
+        """
+        acquired = 0
+        try:
+            for _ in range(self.max_size):
+                if not self._slots.acquire(timeout=self.timeout):
+                    raise TimeoutError(f"Polaczenia z puli nie wrocily po {self.timeout}s")
+                acquired += 1
+            with self._lock:
+                conns = list(self._all)
+            yield conns
+        finally:
+            for _ in range(acquired):
+                self._slots.release()
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+class ShardScheme:
+    """
+    Podzial historii typow na pliki-shardy wg daty typu.
+    Klucz sharda to zawsze 'YYYY-NN':
+      month  - 2026-10 (miesiac kalendarzowy)
+      season - 2026-27 (sezon od lipca do czerwca)
+    """
+
+    SEASON_START_MONTH = 7
+
+    def __init__(self, by: str):
+        if by not in ("month", "season"):
+            raise ValueError(f"Nieznany podzial shardow: {by} (dostepne: month, season)")
+        self.by = by
+
+    def key(self, date: str) -> str:
+        """Klucz sharda dla daty YYYY-MM-DD"""
+        year, month = int(date[:4]), int(date[5:7])
+        if self.by == "month":
+            return f"{year:04d}-{month:02d}"
+        if month < self.SEASON_START_MONTH:
+            year -= 1
+        return f"{year:04d}-{(year + 1) % 100:02d}"
+
+    def date_range(self, key: str) -> Tuple[str, str]:
+        """Pierwszy i ostatni dzien sharda (porownania tekstowe YYYY-MM-DD)"""
+        if self.by == "month":
+            return f"{key}-01", f"{key}-31"
+        year = int(key[:4])
+        return f"{year:04d}-07-01", f"{year + 1:04d}-06-30"
+
+    @staticmethod
+    def ordinal(key: str) -> int:
+        """'2026-10' -> 202610 (zakodowane w id typow sharda)"""
+        return int(key[:4]) * 100 + int(key[5:7])
+
+    @staticmethod
+    def key_from_ordinal(ordinal: int) -> str:
+        return f"{ordinal // 100:04d}-{ordinal % 100:02d}"
+
+
 class Database:
     """Baza SQLite do sledzenia historii typow"""
 
-    def __init__(self, path: str = "betting_history.db"):
+    def __init__(self, path: str = "betting_history.db", profile="durable", pool_size: int = 5,
+                 shard_by: Optional[str] = None, snapshot_path: Optional[str] = None,
+                 snapshot_every: Optional[float] = None, load_path: Optional[str] = None,
+                 readonly: bool = False, immutable: bool = False):
+        """
+        profile: nazwa z PRAGMA_PROFILES albo wlasny slownik {pragma: wartosc}
+        pool_size: max polaczen wspoldzielonych przez watki
+        shard_by: "month" / "season" - typy w osobnych plikach obok `path`
+                  (ATTACH na zadanie), w `path` zostaja tylko wymiary
+        snapshot_path: dla ":memory:" - plik kopii (backup API) zapisywanej przy close()
+        snapshot_every: co ile sekund zapisywac kopie po commicie (None - tylko przy close)
+        load_path: dla ":memory:" - plik historii wczytywany do pamieci na starcie
+                   (np. ten sam co snapshot_path; sam load_path = analiza bez zapisu)
+        readonly: polaczenia mode=ro (raporty obok dzialajacego zapisu, bez migracji)
+        immutable: jak readonly, ale plik nie moze sie zmieniac (kopie, archiwa) -
+                   SQLite pomija blokady i WAL
+        """
         self.path = path
-        self.conn = sqlite3.connect(path)
+        self.pragmas = self._resolve_profile(profile)
+        self.immutable = immutable
+        self.readonly = readonly or immutable
+        if path == ":memory:":
+            if shard_by:
+                raise ValueError("Shardy wymagaja bazy w pliku")
+            if self.readonly:
+                raise ValueError("Baza :memory: nie moze byc tylko do odczytu")
+            # Kazde polaczenie do :memory: to osobna baza
+            pool_size = 1
+        elif snapshot_path or load_path:
+            raise ValueError("snapshot_path / load_path dotycza tylko bazy :memory:")
+        self.snapshot_path = snapshot_path
+        self.snapshot_every = snapshot_every
+        self._last_snapshot = time.monotonic()
+        self._closed = False
+        self.shards = ShardScheme(shard_by) if shard_by else None
+        self.pool = ConnectionPool(self._connect, max_size=pool_size)
+        self._dim_cache: Dict[Tuple, int] = {}
+        # id szablonu uzasadnienia -> (klucz, tekst szablonu zapisany w tym pliku)
+        self._templates: Dict[int, Tuple[str, str]] = {}
+        # Shardy podlaczone do kazdego polaczenia: alias -> czy tylko do odczytu (LRU)
+        self._attached: Dict[sqlite3.Connection, OrderedDict] = {}
+        self._ready_shards = set()
+        # Cache wynikow statystyk: klucz -> (write_version, wynik), LRU
+        self.write_version = 0
+        self._stats_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Tryb tylko do odczytu: partycja -> polaczenie kontrolne i ostatnio widziane PRAGMA data_version
+        self._version_conns: Dict[str, sqlite3.Connection] = {}
+        self._data_versions: Dict[str, int] = {}
+        if self.readonly:
+            self._check_schema()
+            return
+        if load_path and os.path.exists(load_path):
+            self._load_snapshot(load_path)
         self._create_tables()
+        if self.shards:
+            self._move_main_tips_to_shards()
+
+    SCHEMA_VERSION = 1
+
+    # Wyniki liczone w statystykach jako wygrane / przegrane (polowki linii azjatyckich
+    # wg znaku zysku; VOID - ani to, ani to)
+    WIN_RESULTS = "('WIN', 'HALF_WIN')"
+    LOSS_RESULTS = "('LOSS', 'HALF_LOSS')"
+
+    STATS_CACHE_SIZE = 256
+
+    # SQLite domyslnie pozwala na 10 ATTACH na polaczenie
+    MAX_ATTACHED = 8
+    # Id typu w shardzie = (YYYYNN << ID_SHIFT) + kolejny numer - wskazuje shard
+    ID_SHIFT = 32
+
+    TIPS_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            league_id INTEGER NOT NULL REFERENCES leagues(id),
+            match_id INTEGER NOT NULL REFERENCES matches(id),
+            bet_type TEXT NOT NULL,
+            odds REAL NOT NULL,
+            stake REAL NOT NULL,
+            confidence REAL NOT NULL,
+            value REAL NOT NULL,
+            reasoning TEXT,
+            result TEXT,
+            profit REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    '''
 
-    def _create_tables(self):
-        cursor = self.conn.cursor()
+    def _connect(self) -> sqlite3.Connection:
+        target = self._readonly_uri(self.path, self.immutable) if self.readonly else self.path
+        conn = sqlite3.connect(target, check_same_thread=False, uri=True)
+        self._apply_pragmas(conn)
+        return conn
 
-        # Tabela typow
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tips (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                league TEXT NOT NULL,
-                match TEXT NOT NULL,
-                bet_type TEXT NOT NULL,
-                odds REAL NOT NULL,
-                stake REAL NOT NULL,
-                confidence REAL NOT NULL,
-                value REAL NOT NULL,
-                reasoning TEXT,
-                result TEXT,
-                profit REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+    @staticmethod
+    def _readonly_uri(path: str, immutable: bool = False) -> str:
+        uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+        return uri + "&immutable=1" if immutable else uri
+
+    @classmethod
+    def schema_version(cls, path: str) -> int:
+        """Wersja schematu pliku bazy (odczyt bez migracji i bez blokady zapisu)"""
+        conn = sqlite3.connect(cls._readonly_uri(path), uri=True)
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    def _check_schema(self):
+        """Tryb tylko do odczytu nie migruje - baza musi miec biezacy schemat"""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Brak bazy historii: {self.path}")
+        version = self._fetchone("PRAGMA user_version")[0]
+        if version < self.SCHEMA_VERSION:
+            raise ValueError(f"Baza {self.path} wymaga migracji - otworz ja raz w trybie zapisu")
+
+    def connection(self):
+        """Polaczenie z puli (context manager)"""
+        return self.pool.connection()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Polaczenie z puli w transakcji zapisu (commit na wyjsciu, rollback przy bledzie)"""
+        with self.connection() as conn:
+            if conn.in_transaction:
+                # Zagniezdzona transakcja - commit robi zewnetrzna
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                # Id wymiarow wstawionych w tej transakcji przestaja istniec.
+                # Czyszczenie przed rollbackiem - inny zapis nie zdazy ich uzyc
+                self._dim_cache.clear()
+                conn.rollback()
+                raise
+            conn.commit()
+            # Po commicie - odczyt z nowa wersja widzi juz nowe dane
+            with self._cache_lock:
+                self.write_version += 1
+            if self.snapshot_every is not None and \
+                    time.monotonic() - self._last_snapshot >= self.snapshot_every:
+                self.snapshot()
+
+    def _fetchone(self, sql: str, params=()) -> Optional[Tuple]:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params=()) -> List[Tuple]:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _resolve_profile(profile) -> Dict:
+        if isinstance(profile, dict):
+            return dict(profile)
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Nieznany profil PRAGMA: {profile} (dostepne: {', '.join(PRAGMA_PROFILES)})")
+        return dict(PRAGMA_PROFILES[profile])
+
+    # PRAGMA zmieniajace plik - pomijane w trybie tylko do odczytu
+    WRITE_PRAGMAS = ("journal_mode", "synchronous")
+
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        """Ustawia PRAGMA z profilu (journal_mode najpierw - zmienia tryb pliku)"""
+        items = sorted(self.pragmas.items(), key=lambda kv: kv[0] != "journal_mode")
+        for name, value in items:
+            if self.readonly and name in self.WRITE_PRAGMAS:
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.readonly:
+            conn.execute("PRAGMA query_only = ON")
+
+    def _create_tables(self):
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+
+            # Wymiary: ligi, druzyny, mecze (tips trzyma tylko klucze calkowite)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS leagues (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT UNIQUE NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS teams (
+                    id INTEGER PRIMARY KEY,
+                    league_id INTEGER NOT NULL REFERENCES leagues(id),
+                    name TEXT NOT NULL,
+                    UNIQUE (league_id, name)
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_teams_name ON teams (name)")
+            # Szablony uzasadnien - tips.reasoning trzyma tylko ich id i parametry
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS reason_templates (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    template TEXT NOT NULL,
+                    UNIQUE (key, template)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS matches (
+                    id INTEGER PRIMARY KEY,
+                    league_id INTEGER NOT NULL REFERENCES leagues(id),
+                    home_team_id INTEGER NOT NULL REFERENCES teams(id),
+                    away_team_id INTEGER NOT NULL REFERENCES teams(id),
+                    match_date TEXT NOT NULL,
+                    UNIQUE (home_team_id, away_team_id, match_date)
+                )
+            ''')
+            # Historia kursow: tylko dopisywanie, klucz = kolejnosc odczytu per mecz i rynek
+            # (WITHOUT ROWID - wiersze leza w B-drzewie klucza, zakres meczu to jeden przedzial)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS odds_snapshots (
+                    match_id INTEGER NOT NULL REFERENCES matches(id),
+                    market TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    odds REAL NOT NULL,
+                    PRIMARY KEY (match_id, market, ts)
+                ) WITHOUT ROWID
+            ''')
+            # Ranking Elo druzyn (EloRatings) - stan po ostatnim wyniku
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS team_ratings (
+                    team_id INTEGER PRIMARY KEY REFERENCES teams(id),
+                    rating REAL NOT NULL,
+                    games INTEGER NOT NULL
+                )
+            ''')
+            # Mecze juz wliczone do rankingu - ponowny wynik nie zmienia go drugi raz
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rated_matches (
+                    match_id INTEGER PRIMARY KEY REFERENCES matches(id)
+                )
+            ''')
+
+            # Tabela typow
+            cursor.execute(self.TIPS_TABLE_SQL.format(name="tips"))
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(tips)")}
+            migrated = "league" in columns
+            if migrated:
+                self._migrate_denormalized_tips(cursor)
+            cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+            needs_rebuild = self._create_tip_tables(cursor, "main")
+
+        # Baza sprzed rollupow - przelicz z surowych typow
+        if needs_rebuild:
+            self._rebuild_partition("main")
+        # Odzyskaj miejsce po tekstowych kolumnach starej tabeli
+        if migrated:
+            with self.connection() as conn:
+                conn.execute("VACUUM")
+
+    def _create_tip_tables(self, cursor: sqlite3.Cursor, schema: str) -> bool:
+        """
+        Tabele typow i rollupow z indeksami i triggerami w schemacie `schema`
+        (main albo podlaczony shard). Returns: True gdy triggery rollupu sa nowe
+        """
+        if schema != "main":
+            cursor.execute(self.TIPS_TABLE_SQL.format(name=f"{schema}.tips"))
 
         # Tabela statystyk
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS daily_stats (
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.daily_stats (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 date TEXT UNIQUE NOT NULL,
                 tips_count INTEGER DEFAULT 0,
@@ -222,54 +1073,876 @@ class Database:
                 total_stake REAL DEFAULT 0,
                 total_return REAL DEFAULT 0,
                 profit REAL DEFAULT 0,
-                roi REAL DEFAULT 0
+                roi REAL DEFAULT 0,
+                settled INTEGER DEFAULT 0,
+                settled_stake REAL DEFAULT 0
             )
         ''')
+        # Starsze bazy nie maja kolumn rozliczonych typow
+        columns = {row[1] for row in cursor.execute(f"PRAGMA {schema}.table_info(daily_stats)")}
+        if "settled" not in columns:
+            cursor.execute(f"ALTER TABLE {schema}.daily_stats ADD COLUMN settled INTEGER DEFAULT 0")
+        if "settled_stake" not in columns:
+            cursor.execute(f"ALTER TABLE {schema}.daily_stats ADD COLUMN settled_stake REAL DEFAULT 0")
+
+        # Indeksy pod najczestsze zapytania (czesciowe = tylko rozliczone typy,
+        # pokrywajace = get_stats nie siega do tabeli)
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {schema}.idx_tips_settled
+            ON tips (date, result, stake, profit)
+            WHERE result IS NOT NULL
+        ''')
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {schema}.idx_tips_league_settled
+            ON tips (league_id, date, result, stake, profit)
+            WHERE result IS NOT NULL
+        ''')
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {schema}.idx_tips_bet_type_settled
+            ON tips (bet_type, date, result, stake, profit)
+            WHERE result IS NOT NULL
+        ''')
+        # Macierz statystyk (get_stats_matrix): skip-scan po (liga, typ) z zakresem dat,
+        # grupy w kolejnosci indeksu - bez tabeli i bez sortowania
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {schema}.idx_tips_window_cells
+            ON tips (league_id, bet_type, date, result, stake, profit)
+            WHERE result IS NOT NULL
+        ''')
+        # get_recent_tips: ORDER BY created_at DESC LIMIT ? (rowid dolaczany automatycznie)
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {schema}.idx_tips_created_at
+            ON tips (created_at)
+        ''')
+        # Zlaczenia mecz -> typy (rozliczanie, statystyki druzyn)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_tips_match ON tips (match_id)")
+
+        # Triggery utrzymuja daily_stats w tej samej transakcji co zapis typu
+        has_rollup = cursor.execute(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'trigger' AND name = 'trg_tips_rollup_insert'"
+        ).fetchone()
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {schema}.trg_tips_rollup_insert AFTER INSERT ON tips
+            BEGIN {self._rollup_upsert("NEW", 1)} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {schema}.trg_tips_rollup_update
+            AFTER UPDATE OF date, stake, result, profit ON tips
+            BEGIN {self._rollup_upsert("OLD", -1)} {self._rollup_upsert("NEW", 1)} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {schema}.trg_tips_rollup_delete AFTER DELETE ON tips
+            BEGIN {self._rollup_upsert("OLD", -1)} END
+        ''')
+        return not has_rollup
 
-        self.conn.commit()
+    def _migrate_denormalized_tips(self, cursor: sqlite3.Cursor):
+        """Migracja starej tabeli tips (liga i mecz jako tekst) na klucze wymiarow"""
+        # "Gospodarze vs Goscie" -> druzyny; data typu sluzy za date meczu
+        cursor.execute('''
+            CREATE TEMP TABLE _tips_split AS
+            SELECT
+                id, league, date,
+                CASE WHEN instr(match, ' vs ') > 0
+                     THEN substr(match, 1, instr(match, ' vs ') - 1) ELSE match END AS home,
+                CASE WHEN instr(match, ' vs ') > 0
+                     THEN substr(match, instr(match, ' vs ') + 4) ELSE '?' END AS away
+            FROM tips
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO leagues (name) SELECT DISTINCT league FROM _tips_split")
+        cursor.execute('''
+            INSERT OR IGNORE INTO teams (league_id, name)
+            SELECT l.id, s.home FROM _tips_split s JOIN leagues l ON l.name = s.league
+            UNION
+            SELECT l.id, s.away FROM _tips_split s JOIN leagues l ON l.name = s.league
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO matches (league_id, home_team_id, away_team_id, match_date)
+            SELECT DISTINCT l.id, h.id, a.id, s.date
+            FROM _tips_split s
+            JOIN leagues l ON l.name = s.league
+            JOIN teams h ON h.league_id = l.id AND h.name = s.home
+            JOIN teams a ON a.league_id = l.id AND a.name = s.away
+        ''')
 
-    def save_tip(self, tip: BettingTip) -> int:
-        cursor = self.conn.cursor()
+        cursor.execute(self.TIPS_TABLE_SQL.format(name="tips_normalized"))
         cursor.execute('''
-            INSERT INTO tips (date, league, match, bet_type, odds, stake, confidence, value, reasoning)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+            INSERT INTO tips_normalized (id, date, league_id, match_id, bet_type, odds, stake,
+                                         confidence, value, reasoning, result, profit, created_at)
+            SELECT t.id, t.date, l.id, m.id, t.bet_type, t.odds, t.stake,
+                   t.confidence, t.value, t.reasoning, t.result, t.profit, t.created_at
+            FROM tips t
+            JOIN _tips_split s ON s.id = t.id
+            JOIN leagues l ON l.name = s.league
+            JOIN teams h ON h.league_id = l.id AND h.name = s.home
+            JOIN teams a ON a.league_id = l.id AND a.name = s.away
+            JOIN matches m ON m.home_team_id = h.id AND m.away_team_id = a.id AND m.match_date = s.date
+        ''')
+        # Razem ze stara tabela znikaja jej indeksy i triggery - odtworzy je _create_tables
+        cursor.execute("DROP TABLE tips")
+        cursor.execute("ALTER TABLE tips_normalized RENAME TO tips")
+        cursor.execute("DROP TABLE temp._tips_split")
+
+    @staticmethod
+    def _rollup_upsert(row: str, sign: int) -> str:
+        """SQL dodajacy (sign=1) lub odejmujacy (sign=-1) wiersz tips od rollupu dnia"""
+        settled = f"({row}.result IS NOT NULL)"
+        return f'''
+            INSERT INTO daily_stats (date, tips_count, wins, losses, settled, total_stake,
+                                     settled_stake, total_return, profit, roi)
+            VALUES (
+                {row}.date,
+                {sign},
+                {sign} * IFNULL({row}.result IN {Database.WIN_RESULTS}, 0),
+                {sign} * IFNULL({row}.result IN {Database.LOSS_RESULTS}, 0),
+                {sign} * {settled},
+                {sign} * {row}.stake,
+                {sign} * {settled} * {row}.stake,
+                {sign} * {settled} * ({row}.stake + COALESCE({row}.profit, 0)),
+                {sign} * COALESCE({row}.profit, 0),
+                0
+            )
+            ON CONFLICT (date) DO UPDATE SET
+                tips_count = tips_count + excluded.tips_count,
+                wins = wins + excluded.wins,
+                losses = losses + excluded.losses,
+                settled = settled + excluded.settled,
+                total_stake = total_stake + excluded.total_stake,
+                settled_stake = settled_stake + excluded.settled_stake,
+                total_return = total_return + excluded.total_return,
+                profit = profit + excluded.profit,
+                roi = CASE WHEN settled_stake + excluded.settled_stake > 0
+                           THEN (profit + excluded.profit) * 100.0 / (settled_stake + excluded.settled_stake)
+                           ELSE 0 END;
+        '''
+
+    def rebuild_daily_stats(self):
+        """Przelicza od zera tabele daily_stats z surowych typow (shardy zapisywalne)"""
+        for key in self._partitions(writable=True):
+            self._rebuild_partition(key)
+
+    def _rebuild_partition(self, key: str):
+        with self.connection() as conn:
+            schema = self._attach(conn, key)
+            with self.transaction() as conn:
+                conn.execute(f"DELETE FROM {schema}.daily_stats")
+                conn.execute(f'''
+                    INSERT INTO {schema}.daily_stats (date, tips_count, wins, losses, settled,
+                                                      total_stake, settled_stake, total_return,
+                                                      profit, roi)
+                    SELECT
+                        date,
+                        COUNT(*),
+                        SUM(IFNULL(result IN {self.WIN_RESULTS}, 0)),
+                        SUM(IFNULL(result IN {self.LOSS_RESULTS}, 0)),
+                        SUM(result IS NOT NULL),
+                        SUM(stake),
+                        SUM(CASE WHEN result IS NOT NULL THEN stake ELSE 0 END),
+                        SUM(CASE WHEN result IS NOT NULL THEN stake + COALESCE(profit, 0) ELSE 0 END),
+                        SUM(COALESCE(profit, 0)),
+                        0
+                    FROM {schema}.tips
+                    GROUP BY date
+                ''')
+                conn.execute(f'''
+                    UPDATE {schema}.daily_stats
+                    SET roi = CASE WHEN settled_stake > 0 THEN profit * 100.0 / settled_stake ELSE 0 END
+                ''')
+
+    # ---- Shardy (partycje historii) ----
+    # Partycja to "main" (baza bez shardow) albo klucz sharda, np. "2026-10".
+
+    def _shard_path(self, key: str) -> str:
+        stem, _ = os.path.splitext(self.path)
+        return f"{stem}.{self.shards.by}-{key}.db"
+
+    @staticmethod
+    def _shard_alias(key: str) -> str:
+        return "shard_" + key.replace("-", "_")
+
+    def shard_keys(self) -> List[str]:
+        """Klucze istniejacych plikow-shardow, rosnaco"""
+        if not self.shards:
+            return []
+        stem, _ = os.path.splitext(os.path.basename(self.path))
+        prefix = f"{stem}.{self.shards.by}-"
+        directory = os.path.dirname(os.path.abspath(self.path))
+        return sorted(
+            name[len(prefix):-3] for name in os.listdir(directory)
+            if name.startswith(prefix) and name.endswith(".db")
+        )
+
+    def is_archived(self, key: str) -> bool:
+        """Shard zarchiwizowany = plik tylko do odczytu"""
+        if key == "main":
+            return False
+        path = self._shard_path(key)
+        return os.path.exists(path) and not os.stat(path).st_mode & stat.S_IWUSR
+
+    def _partitions(self, since: Optional[str] = None, until: Optional[str] = None,
+                    writable: bool = False) -> List[str]:
+        """Partycje pokrywajace okno dat [since, until]"""
+        if not self.shards:
+            return ["main"]
+        low = self.shards.key(since) if since else None
+        high = self.shards.key(until) if until else None
+        return [
+            key for key in self.shard_keys()
+            if (low is None or key >= low) and (high is None or key <= high)
+            and not (writable and self.is_archived(key))
+        ]
+
+    def _partition_for_date(self, date: str) -> str:
+        if not self.shards:
+            return "main"
+        key = self.shards.key(date)
+        if self.is_archived(key):
+            raise ValueError(f"Shard {key} jest zarchiwizowany (tylko do odczytu)")
+        return key
+
+    def _partitions_for_id(self, tip_id: int) -> List[str]:
+        """Partycje, w ktorych moze byc typ (id z shardu wskazuje go bezposrednio)"""
+        if not self.shards:
+            return ["main"]
+        ordinal = tip_id >> self.ID_SHIFT
+        if not ordinal:
+            # Typ przeniesiony z bazy sprzed shardow - zachowal stare id
+            return self._partitions(writable=True)
+        key = self.shards.key_from_ordinal(ordinal)
+        if key not in self.shard_keys():
+            return []
+        if self.is_archived(key):
+            raise ValueError(f"Shard {key} jest zarchiwizowany (tylko do odczytu)")
+        return [key]
+
+    def _reject_archived_ids(self, tip_ids: List[int]):
+        """Typy sprzed shardow (id bez numeru sharda) - ValueError, jesli leza w zarchiwizowanym"""
+        placeholders = ", ".join("?" * len(tip_ids))
+        for key in self.shard_keys():
+            if self.is_archived(key) and self._query(
+                    key, f"SELECT 1 FROM {{tips}} WHERE id IN ({placeholders}) LIMIT 1", tip_ids):
+                raise ValueError(f"Shard {key} jest zarchiwizowany (tylko do odczytu)")
+
+    def _attach(self, conn: sqlite3.Connection, key: str) -> str:
+        """
+        Podlacza shard do polaczenia (tworzy go przy pierwszym uzyciu).
+        ATTACH nie dziala w transakcji - wolac przed transaction().
+        Returns: nazwa schematu do uzycia w SQL
+        """
+        if key == "main":
+            return "main"
+
+        alias = self._shard_alias(key)
+        archived = self.is_archived(key)
+        attached = self._attached.setdefault(conn, OrderedDict())
+        if alias in attached:
+            if attached[alias] == archived:
+                attached.move_to_end(alias)
+                return alias
+            # Shard zarchiwizowany od czasu podlaczenia - podlacz ponownie tylko do odczytu
+            conn.execute(f"DETACH DATABASE {alias}")
+            del attached[alias]
+
+        while len(attached) >= self.MAX_ATTACHED:
+            oldest, _ = attached.popitem(last=False)
+            conn.execute(f"DETACH DATABASE {oldest}")
+
+        path = self._shard_path(key)
+        if archived or self.readonly:
+            # immutable: bez blokad i bez plikow -wal/-shm
+            uri = self._readonly_uri(path, immutable=archived or self.immutable)
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (uri,))
+        else:
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+            for name in self.WRITE_PRAGMAS:
+                if name in self.pragmas:
+                    conn.execute(f"PRAGMA {alias}.{name} = {self.pragmas[name]}")
+        attached[alias] = archived
+
+        if not archived and not self.readonly and key not in self._ready_shards:
+            with self.transaction() as conn:
+                self._create_tip_tables(conn.cursor(), alias)
+                # Id typow sharda zaczynaja sie od (YYYYNN << ID_SHIFT)
+                conn.execute(f'''
+                    INSERT INTO {alias}.sqlite_sequence (name, seq)
+                    SELECT 'tips', ? WHERE NOT EXISTS
+                        (SELECT 1 FROM {alias}.sqlite_sequence WHERE name = 'tips')
+                ''', (self.shards.ordinal(key) << self.ID_SHIFT,))
+            self._ready_shards.add(key)
+        return alias
+
+    def _query(self, key: str, sql: str, params=()) -> List[Tuple]:
+        """Zapytanie do jednej partycji - {tips} i {daily_stats} wskazuja jej tabele"""
+        with self.connection() as conn:
+            schema = self._attach(conn, key)
+            sql = sql.format(tips=f"{schema}.tips", daily_stats=f"{schema}.daily_stats")
+            return conn.execute(sql, params).fetchall()
+
+    def archive_shard(self, key: str):
+        """
+        Archiwizuje shard: checkpoint WAL, journal_mode=DELETE i plik tylko do odczytu.
+        Potem jest podlaczany jako immutable; zapisy do niego rzucaja ValueError.
+        """
+        if not self.shards or key not in self.shard_keys():
+            raise ValueError(f"Brak sharda: {key}")
+        if key == self.shards.key(datetime.now().strftime("%Y-%m-%d")):
+            raise ValueError(f"Nie mozna zarchiwizowac biezacego sharda: {key}")
+
+        alias = self._shard_alias(key)
+        with self.pool.exclusive() as conns:
+            for conn in conns:
+                attached = self._attached.get(conn, {})
+                if alias in attached:
+                    conn.execute(f"DETACH DATABASE {alias}")
+                    del attached[alias]
+
+            path = self._shard_path(key)
+            shard = sqlite3.connect(path)
+            try:
+                shard.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                shard.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                shard.close()
+            os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        self._ready_shards.discard(key)
+
+    def _move_main_tips_to_shards(self):
+        """Wlaczenie shardow na istniejacej bazie - przenosi typy z glownego pliku"""
+        dates = [row[0] for row in self._fetchall("SELECT DISTINCT date FROM main.tips")]
+        if not dates:
+            return
+        for key in sorted({self.shards.key(date) for date in dates}):
+            first, last = self.shards.date_range(key)
+            with self.connection() as conn:
+                schema = self._attach(conn, key)
+                with self.transaction() as conn:
+                    conn.execute(f"INSERT INTO {schema}.tips SELECT * FROM main.tips WHERE date BETWEEN ? AND ?",
+                                 (first, last))
+                    conn.execute("DELETE FROM main.tips WHERE date BETWEEN ? AND ?", (first, last))
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM main.daily_stats WHERE tips_count = 0")
+
+    # ---- Zapis ----
+
+    INSERT_TIP_SQL = '''
+        INSERT INTO {tips} (date, league_id, match_id, bet_type, odds, stake, confidence, value, reasoning)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    # Kolumny klucza naturalnego kazdego wymiaru
+    DIMENSION_KEYS = {
+        "leagues": ("name",),
+        "teams": ("league_id", "name"),
+        "matches": ("league_id", "home_team_id", "away_team_id", "match_date"),
+        "reason_templates": ("key", "template"),
+    }
+
+    def _dimension_id(self, conn: sqlite3.Connection, table: str, key: Tuple) -> int:
+        """Id wiersza wymiaru (z cache, z bazy albo nowo wstawione)"""
+        cache_key = (table, key)
+        dim_id = self._dim_cache.get(cache_key)
+        if dim_id is not None:
+            return dim_id
+
+        columns = self.DIMENSION_KEYS[table]
+        where = " AND ".join(f"{column} = ?" for column in columns)
+        row = conn.execute(f"SELECT id FROM {table} WHERE {where}", key).fetchone()
+        if row:
+            dim_id = row[0]
+        else:
+            placeholders = ", ".join("?" * len(columns))
+            dim_id = conn.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", key
+            ).lastrowid
+        self._dim_cache[cache_key] = dim_id
+        return dim_id
+
+    def _match_ids(self, conn: sqlite3.Connection, match: Match) -> Tuple[int, int]:
+        """(league_id, match_id) meczu - wstawia brakujace wymiary"""
+        league_id = self._dimension_id(conn, "leagues", (match.league.league_name,))
+        home_id = self._dimension_id(conn, "teams", (league_id, match.home_team.name))
+        away_id = self._dimension_id(conn, "teams", (league_id, match.away_team.name))
+        match_id = self._dimension_id(
+            conn, "matches", (league_id, home_id, away_id, match.kickoff.strftime("%Y-%m-%d"))
+        )
+        return league_id, match_id
+
+    def _tip_row(self, conn: sqlite3.Connection, tip: BettingTip) -> Tuple:
+        """Zamienia typ na wiersz tabeli tips (rozwiazuje klucze wymiarow)"""
+        league_id, match_id = self._match_ids(conn, tip.match)
+        return (
             tip.timestamp.strftime("%Y-%m-%d"),
-            tip.match.league.league_name,
-            str(tip.match),
+            league_id,
+            match_id,
             tip.bet_type.code,
             tip.odds,
             tip.stake,
             tip.confidence,
             tip.value,
-            json.dumps(tip.reasoning, ensure_ascii=False)
-        ))
-        self.conn.commit()
-        return cursor.lastrowid
+            self._encode_reasoning(conn, tip.reasoning)
+        )
 
-    def update_result(self, tip_id: int, result: str, profit: float):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            UPDATE tips SET result = ?, profit = ? WHERE id = ?
-        ''', (result, profit, tip_id))
-        self.conn.commit()
+    def _encode_reasoning(self, conn: sqlite3.Connection, reasons: List) -> str:
+        """
+        Uzasadnienia jako JSON: Reason -> [id_szablonu, *parametry], tekst zostaje tekstem.
+        Floaty zaokraglone do 6 miejsc (szablony pokazuja najwyzej 1 miejsce po przecinku).
+        """
+        encoded = []
+        for reason in reasons:
+            if isinstance(reason, Reason):
+                template_id = self._dimension_id(
+                    conn, "reason_templates", (reason.key, REASON_TEMPLATES[reason.key])
+                )
+                encoded.append([template_id] + [
+                    round(param, 6) if isinstance(param, float) else param for param in reason.params
+                ])
+            else:
+                encoded.append(str(reason))
+        return json.dumps(encoded, ensure_ascii=False, separators=(",", ":"))
 
-    def get_stats(self, days: int = 30) -> Dict:
-        cursor = self.conn.cursor()
+    def decode_reasoning(self, raw: Optional[str]) -> List:
+        """Odwrotnosc _encode_reasoning: lista Reason / str (tekst renderuje dopiero str())"""
+        if not raw:
+            return []
+        reasons = []
+        for item in json.loads(raw):
+            if isinstance(item, str):
+                # Zapis sprzed szablonow albo tekst spoza rejestru
+                reasons.append(item)
+                continue
+            template_id, *params = item
+            entry = self._templates.get(template_id)
+            if entry is None:
+                self._load_templates()
+                entry = self._templates[template_id]
+            key, template = entry
+            if REASON_TEMPLATES.get(key) == template:
+                reasons.append(Reason(key, tuple(params)))
+            else:
+                # Szablon zmieniony w kodzie (albo usuniety) - stary wpis w brzmieniu z tej bazy
+                reasons.append(template.format(*params))
+        return reasons
+
+    def _load_templates(self):
+        for template_id, key, template in self._fetchall(
+                "SELECT id, key, template FROM main.reason_templates"):
+            self._templates[template_id] = (key, template)
+
+    def save_tip(self, tip: BettingTip) -> int:
+        return self.save_tips([tip])[0]
+
+    def save_tips(self, tips: Iterable[BettingTip]) -> List[int]:
+        """
+        Zapisuje wiele typow w jednej transakcji (jeden commit zamiast N;
+        przy shardach - jedna transakcja na shard).
+        Returns: id nowych wierszy w kolejnosci wejsciowej
+        """
+        tips = list(tips)
+        groups: Dict[str, List[int]] = {}
+        for index, tip in enumerate(tips):
+            key = self._partition_for_date(tip.timestamp.strftime("%Y-%m-%d"))
+            groups.setdefault(key, []).append(index)
+
+        ids = [0] * len(tips)
+        for key, indexes in groups.items():
+            with self.connection() as conn:
+                schema = self._attach(conn, key)
+                with self.transaction() as conn:
+                    rows = [self._tip_row(conn, tips[i]) for i in indexes]
+                    conn.executemany(self.INSERT_TIP_SQL.format(tips=f"{schema}.tips"), rows)
+                    # AUTOINCREMENT w jednej transakcji nadaje kolejne id,
+                    # wiec wystarczy ostatnie id i liczba wierszy
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+            first_id = last_id - len(indexes) + 1
+            for offset, index in enumerate(indexes):
+                ids[index] = first_id + offset
+        return ids
+
+    # Zysk liczony z zapisanych kursu i stawki, jesli nie podano go jawnie
+    # (ta sama regula co calculate_profit)
+    UPDATE_RESULT_SQL = '''
+        UPDATE {tips} SET
+            result = ?1,
+            profit = COALESCE(?2, CASE ?1
+                WHEN 'WIN' THEN stake * (odds - 1)
+                WHEN 'HALF_WIN' THEN stake * (odds - 1) / 2
+                WHEN 'LOSS' THEN -stake
+                WHEN 'HALF_LOSS' THEN -stake / 2
+                ELSE 0 END)
+        WHERE id = ?3
+    '''
+
+    def update_result(self, tip_id: int, result: str, profit: Optional[float] = None):
+        self._apply_results([(result, profit, tip_id)])
+
+    def _apply_results(self, updates: List[Tuple]) -> int:
+        """
+        Wykonuje UPDATE_RESULT_SQL dla (result, profit, tip_id) - transakcja na partycje.
+        Wynik spoza RESULTS albo typ w zarchiwizowanym shardzie - ValueError (jak save_tips),
+        przed jakimkolwiek zapisem
+        """
+        unknown = sorted({update[0] for update in updates} - set(RESULTS), key=str)
+        if unknown:
+            raise ValueError(f"Nieznany wynik typu: {', '.join(map(repr, unknown))} "
+                             f"(dostepne: {', '.join(RESULTS)})")
+        if self.shards:
+            legacy = [update[2] for update in updates if not update[2] >> self.ID_SHIFT]
+            if legacy:
+                self._reject_archived_ids(legacy)
+        groups: Dict[str, List[Tuple]] = {}
+        for update in updates:
+            for key in self._partitions_for_id(update[2]):
+                groups.setdefault(key, []).append(update)
+
+        settled = 0
+        for key, group in groups.items():
+            with self.connection() as conn:
+                schema = self._attach(conn, key)
+                with self.transaction() as conn:
+                    sql = self.UPDATE_RESULT_SQL.format(tips=f"{schema}.tips")
+                    settled += conn.executemany(sql, group).rowcount
+        return settled
+
+    def settle_many(self, records: Iterable[Tuple], chunk_size: int = 500,
+                    skip_unknown: bool = False) -> int:
+        """
+        Rozlicza wiele typow naraz. Rekordy:
+          (tip_id, result)  - np. (42, 'WIN'); result z RESULTS
+          (match, score)    - np. (Match, (2, 1)) albo ('Arsenal vs Chelsea @ 2026-10-18', '2:1');
+                              rozlicza nierozliczone typy na ten jeden mecz (liga, druzyny, data).
+                              Tekst bez daty tylko gdy jeden mecz tych druzyn ma nierozliczone typy
+        Zysk wyliczany z zapisanych kursow i stawek.
+        Nieznany wynik, niejednoznaczny albo niezapisany mecz - ValueError przed zapisem
+        chunku (skip_unknown=True pomija mecze bez zapisanych typow, np. cala kolejka wynikow).
+        Transakcje: osobna na kazda partycje w chunku (najpierw jawne wyniki, potem mecze),
+        wiec przerwane rozliczenie zostawia czesc typow rozliczonych - powtorzenie jest
+        bezpieczne (mecze rozliczaja tylko nierozliczone typy).
+        Returns: liczba rozliczonych typow
+        """
+        settled = 0
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                settled += self._settle_chunk(chunk, skip_unknown)
+                chunk = []
+        if chunk:
+            settled += self._settle_chunk(chunk, skip_unknown)
+        return settled
+
+    def _settle_chunk(self, records: List[Tuple], skip_unknown: bool) -> int:
+        by_id = []
+        scores: Dict[int, Tuple[int, int]] = {}
+        missing = []
+        for key, value in records:
+            if isinstance(key, int):
+                by_id.append((value, None, key))
+                continue
+            match_id = self._find_match_id(key)
+            if match_id is not None:
+                scores[match_id] = parse_score(value)
+            elif not skip_unknown:
+                missing.append(str(key))
+        if missing:
+            raise ValueError(f"Brak zapisanego meczu: {', '.join(missing)}")
+
+        # Najpierw jawne wyniki, zeby mecz nie nadpisal ich ponizej
+        settled = self._apply_results(by_id)
+        if not scores:
+            return settled
+
+        placeholders = ", ".join("?" * len(scores))
+        for key in self._partitions(writable=True):
+            with self.connection() as conn:
+                schema = self._attach(conn, key)
+                with self.transaction() as conn:
+                    pending = conn.execute(f'''
+                        SELECT id, match_id, bet_type FROM {schema}.tips
+                        WHERE result IS NULL AND match_id IN ({placeholders})
+                    ''', list(scores)).fetchall()
+                    by_match = []
+                    for tip_id, match_id, bet_code in pending:
+                        result = settle_bet(bet_code, *scores[match_id])
+                        if result is not None:
+                            by_match.append((result, None, tip_id))
+                    sql = self.UPDATE_RESULT_SQL.format(tips=f"{schema}.tips")
+                    settled += conn.executemany(sql, by_match).rowcount
+
+        return settled
+
+    FIND_MATCH_SQL = '''
+        SELECT m.id
+        FROM matches m
+        JOIN leagues l ON l.id = m.league_id
+        JOIN teams hteam ON hteam.id = m.home_team_id
+        JOIN teams ateam ON ateam.id = m.away_team_id
+        WHERE hteam.name = ? AND ateam.name = ?
+    '''
+
+    def _find_match_id(self, key) -> Optional[int]:
+        """
+        Id zapisanego meczu (bez wstawiania wymiarow): Match - liga, druzyny i data kickoff;
+        tekst 'Gospodarze vs Goscie' z opcjonalnym ' @ RRRR-MM-DD'. None - brak meczu
+        """
+        if isinstance(key, Match):
+            row = self._fetchone(self.FIND_MATCH_SQL + " AND l.name = ? AND m.match_date = ?", (
+                key.home_team.name, key.away_team.name, key.league.league_name,
+                key.kickoff.strftime("%Y-%m-%d"),
+            ))
+            return row[0] if row else None
+
+        text, _, date = str(key).partition(" @ ")
+        home, _, away = text.partition(" vs ")
+        if date:
+            rows = self._fetchall(self.FIND_MATCH_SQL + " AND m.match_date = ?", (home, away, date.strip()))
+        else:
+            rows = self._fetchall(self.FIND_MATCH_SQL, (home, away))
+        match_ids = [row[0] for row in rows]
+        if len(match_ids) > 1:
+            # Ta sama para gra wiele razy - bez daty tylko jesli typy czekaja na jeden mecz
+            match_ids = [match_id for match_id in match_ids if self._has_pending_tips(match_id)]
+            if len(match_ids) > 1:
+                raise ValueError(f"Mecz {text!r} jest niejednoznaczny ({len(match_ids)} terminy "
+                                 f"z nierozliczonymi typami) - podaj date: '{text} @ RRRR-MM-DD'")
+        return match_ids[0] if match_ids else None
+
+    def _has_pending_tips(self, match_id: int) -> bool:
+        return any(
+            self._query(key, "SELECT 1 FROM {tips} WHERE match_id = ? AND result IS NULL LIMIT 1", (match_id,))
+            for key in self._partitions(writable=True)
+        )
+
+    def _cached(self, key: Tuple, compute: Callable, partitions: Optional[List[str]] = None):
+        """
+        Wynik zapytania z cache, jesli od jego policzenia nie bylo zapisu.
+        W trybie zapisu licza sie zapisy przez ten obiekt Database; w trybie tylko
+        do odczytu - zapisy innych procesow do main i `partitions` (partycje
+        czytane przez zapytanie, domyslnie wszystkie; _data_changed).
+        """
+        with self._cache_lock:
+            if self.readonly and self._data_changed(self._partitions() if partitions is None else partitions):
+                self.write_version += 1
+            version = self.write_version
+            hit = self._stats_cache.get(key)
+            if hit is not None and hit[0] == version:
+                self._stats_cache.move_to_end(key)
+                return hit[1]
+
+        # Wersja sprzed zapytania - zapis w trakcie uniewazni wynik
+        value = compute()
+        with self._cache_lock:
+            self._stats_cache[key] = (version, value)
+            self._stats_cache.move_to_end(key)
+            if len(self._stats_cache) > self.STATS_CACHE_SIZE:
+                self._stats_cache.popitem(last=False)
+        return value
+
+    def _data_changed(self, partitions: List[str]) -> bool:
+        """
+        Czy od ostatniego sprawdzenia ktos zapisal do main albo do `partitions`.
+        data_version mozna porownywac tylko w obrebie jednego polaczenia, a shard
+        odlaczony przez LRU w _attach i podlaczony ponownie liczy od nowa - stad
+        osobne polaczenie kontrolne na plik (bez ATTACH, wiec bez limitu MAX_ATTACHED)
+        i wersje per klucz partycji. Zarchiwizowane shardy sie nie zmieniaja.
+        Wolane pod _cache_lock.
+        """
+        if self.immutable:
+            return False
+        changed = False
+        for key in ["main"] + [key for key in partitions if key != "main" and not self.is_archived(key)]:
+            conn = self._version_conns.get(key)
+            if conn is None:
+                path = self.path if key == "main" else self._shard_path(key)
+                conn = sqlite3.connect(self._readonly_uri(path), uri=True, check_same_thread=False)
+                self._version_conns[key] = conn
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._data_versions.get(key) != version:
+                self._data_versions[key] = version
+                changed = True
+        return changed
+
+    # ---- Historia kursow ----
+
+    def record_odds(self, matches: Iterable[Match], ts: Optional[datetime] = None) -> int:
+        """
+        Dopisuje biezace kursy meczow (ODDS_MARKETS i match.markets) jako jeden odczyt z chwili `ts`.
+        Cala partia w jednej transakcji. Returns: liczba zapisanych kursow
+        """
+        ts = int((ts or datetime.now()).timestamp())
+        with self.transaction() as conn:
+            rows = []
+            for match in matches:
+                _, match_id = self._match_ids(conn, match)
+                for market, field_name in ODDS_MARKETS.items():
+                    odds = getattr(match, field_name)
+                    if odds > 0:
+                        rows.append((match_id, market, ts, odds))
+                for market, odds in match.markets.items():
+                    if odds > 0:
+                        rows.append((match_id, market.code, ts, odds))
+            # Ponowny odczyt z ta sama sekunda nadpisuje poprzedni
+            conn.executemany(
+                "INSERT OR REPLACE INTO odds_snapshots (match_id, market, ts, odds) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def get_odds_history(self, match: Match, market: Optional[str] = None,
+                         since: Optional[datetime] = None,
+                         until: Optional[datetime] = None) -> List[OddsTick]:
+        """Kursy meczu w kolejnosci czasu (market - BetType.code / Market.code, domyslnie wszystkie)"""
+        match_id = self._find_match_id(match)
+        if match_id is None:
+            return []
+
+        where, params = ["match_id = ?"], [match_id]
+        if market is not None:
+            where.append("market = ?")
+            params.append(market)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(int(since.timestamp()))
+        if until is not None:
+            where.append("ts <= ?")
+            params.append(int(until.timestamp()))
+
+        rows = self._fetchall(f'''
+            SELECT market, ts, odds FROM odds_snapshots
+            WHERE {" AND ".join(where)}
+            ORDER BY market, ts
+        ''', params)
+        return [OddsTick(market, datetime.fromtimestamp(ts), odds) for market, ts, odds in rows]
+
+    def compact_odds(self, older_than_days: int = 7, bucket_seconds: int = 3600) -> int:
+        """
+        Downsampling starych odczytow: starsze niz `older_than_days` zostaja
+        jako ostatni kurs w kazdym przedziale `bucket_seconds` (per mecz i rynek).
+        Returns: liczba usunietych odczytow
+        """
+        cutoff = int((datetime.now() - timedelta(days=older_than_days)).timestamp())
+        with self.transaction() as conn:
+            # Usuwa odczyt, jesli w tym samym przedziale jest pozniejszy
+            # (sprawdzenie to jeden krok po kluczu glownym)
+            return conn.execute('''
+                DELETE FROM odds_snapshots
+                WHERE ts < ?1 AND EXISTS (
+                    SELECT 1 FROM odds_snapshots later
+                    WHERE later.match_id = odds_snapshots.match_id
+                      AND later.market = odds_snapshots.market
+                      AND later.ts > odds_snapshots.ts
+                      AND later.ts < MIN(?1, (odds_snapshots.ts / ?2 + 1) * ?2)
+                )
+            ''', (cutoff, bucket_seconds)).rowcount
+
+    def save_ratings(self, rows: Iterable[Tuple[str, str, float, int]], replace_all: bool = False,
+                     rated: Iterable[Match] = ()) -> int:
+        """
+        Zapisuje rankingi (liga, druzyna, ranking, mecze) - jedna transakcja.
+        replace_all: usuwa najpierw wszystkie zapisane (po odtworzeniu od zera)
+        rated: mecze wliczone w te rankingi (w tej samej transakcji - patrz unrated)
+        """
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO rated_matches (match_id) VALUES (?)",
+                             [(self._match_ids(conn, match)[1],) for match in rated])
+            if replace_all:
+                conn.execute("DELETE FROM team_ratings")
+            params = []
+            for league, team, rating, games in rows:
+                league_id = self._dimension_id(conn, "leagues", (league,))
+                team_id = self._dimension_id(conn, "teams", (league_id, team))
+                params.append((team_id, rating, games))
+            conn.executemany(
+                "INSERT OR REPLACE INTO team_ratings (team_id, rating, games) VALUES (?, ?, ?)",
+                params
+            )
+        return len(params)
+
+    def unrated(self, matches: Iterable[Match]) -> List[bool]:
+        """Dla kazdego meczu: True, jesli jego wynik nie jest jeszcze w rankingu (save_ratings rated)"""
+        flags = []
+        for match in matches:
+            match_id = self._find_match_id(match)
+            flags.append(match_id is None or not self._fetchone(
+                "SELECT 1 FROM rated_matches WHERE match_id = ?", (match_id,)))
+        return flags
+
+    def load_ratings(self) -> List[Tuple[str, str, float, int]]:
+        """Zapisane rankingi: (liga, druzyna, ranking, mecze)"""
+        return self._fetchall('''
+            SELECT l.name, t.name, r.rating, r.games
+            FROM team_ratings r
+            JOIN teams t ON t.id = r.team_id
+            JOIN leagues l ON l.id = t.league_id
+        ''')
+
+    def clear_stats_cache(self):
+        with self._cache_lock:
+            self._stats_cache.clear()
+
+    def get_stats(self, days: int = 30, league: Optional[str] = None,
+                  bet_type: Optional[str] = None) -> Dict:
+        """
+        Statystyki rozliczonych typow z ostatnich `days` dni.
+        league / bet_type: opcjonalny filtr (nazwa ligi, BetType.code)
+        Powtorny odczyt bez zapisow w miedzyczasie idzie z cache.
+        """
         since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        stats = self._cached(("stats", since, league, bet_type),
+                             lambda: self._query_stats(since, league, bet_type),
+                             self._partitions(since=since))
+        return dict(stats)
+
+    def _query_stats(self, since: str, league: Optional[str], bet_type: Optional[str]) -> Dict:
+
+        if league is None and bet_type is None:
+            # Maksymalnie `days` wierszy rollupu zamiast skanu historii
+            sql = '''
+                SELECT
+                    SUM(settled) as total,
+                    SUM(wins) as wins,
+                    SUM(losses) as losses,
+                    SUM(settled_stake) as total_stake,
+                    SUM(profit) as total_profit
+                FROM {daily_stats}
+                WHERE date >= ?
+            '''
+            params = [since]
+        else:
+            where = ["date >= ?", "result IS NOT NULL"]
+            params = [since]
+            if league is not None:
+                where.insert(0, "league_id = (SELECT id FROM main.leagues WHERE name = ?)")
+                params.insert(0, league)
+            if bet_type is not None:
+                where.insert(0, "bet_type = ?")
+                params.insert(0, bet_type)
+
+            sql = f'''
+                SELECT
+                    COUNT(*) as total,
+                    SUM(CASE WHEN result IN {self.WIN_RESULTS} THEN 1 ELSE 0 END) as wins,
+                    SUM(CASE WHEN result IN {self.LOSS_RESULTS} THEN 1 ELSE 0 END) as losses,
+                    SUM(stake) as total_stake,
+                    SUM(COALESCE(profit, 0)) as total_profit
+                FROM {{tips}}
+                WHERE {" AND ".join(where)}
+            '''
+
+        # Tylko shardy, ktore pokrywaja okno
+        rows = [row for key in self._partitions(since=since) for row in self._query(key, sql, params)]
+        return self._stats_from_row(self._sum_rows(rows))
 
-        cursor.execute('''
-            SELECT
-                COUNT(*) as total,
-                SUM(CASE WHEN result = 'WIN' THEN 1 ELSE 0 END) as wins,
-                SUM(CASE WHEN result = 'LOSS' THEN 1 ELSE 0 END) as losses,
-                SUM(stake) as total_stake,
-                SUM(COALESCE(profit, 0)) as total_profit
-            FROM tips
-            WHERE date >= ? AND result IS NOT NULL
-        ''', (since,))
+    @staticmethod
+    def _sum_rows(rows: List[Tuple]) -> Optional[Tuple]:
+        """Sumuje kolumny wierszy agregatow z wielu partycji (NULL = 0)"""
+        if not rows:
+            return None
+        return tuple(sum(value or 0 for value in column) for column in zip(*rows))
 
-        row = cursor.fetchone()
+    @staticmethod
+    def _stats_from_row(row: Optional[Tuple]) -> Dict:
+        """(total, wins, losses, stake, profit) -> slownik statystyk"""
         if not row or not row[0]:
             return {
                 "total": 0,
@@ -297,26 +1970,558 @@ class Database:
             "success_rate": (wins / total * 100) if total else 0
         }
 
-    def get_recent_tips(self, limit: int = 10) -> List[Dict]:
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT date, league, match, bet_type, odds, stake, confidence, result, profit
-            FROM tips
-            ORDER BY created_at DESC
-            LIMIT ?
-        ''', (limit,))
+    def get_team_stats(self, days: int = 30, league: Optional[str] = None) -> List[Dict]:
+        """
+        Statystyki rozliczonych typow per druzyna (mecze z jej udzialem),
+        liczone na kluczach calkowitych. Posortowane po zysku.
+        """
+        since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        teams = self._cached(("team_stats", since, league), lambda: self._query_team_stats(since, league),
+                             self._partitions(since=since))
+        return [dict(team) for team in teams]
+
+    def _query_team_stats(self, since: str, league: Optional[str]) -> List[Dict]:
+        params = [since]
+        league_where = ""
+        if league is not None:
+            league_where = "AND t.league_id = (SELECT id FROM main.leagues WHERE name = ?)"
+            params.append(league)
+
+        sql = f'''
+            SELECT
+                tm.id,
+                COUNT(*),
+                SUM(t.result IN {self.WIN_RESULTS}),
+                SUM(t.result IN {self.LOSS_RESULTS}),
+                SUM(t.stake),
+                SUM(COALESCE(t.profit, 0))
+            FROM {{tips}} t
+            JOIN main.matches m ON m.id = t.match_id
+            JOIN main.teams tm ON tm.id IN (m.home_team_id, m.away_team_id)
+            WHERE t.date >= ? AND t.result IS NOT NULL {league_where}
+            GROUP BY tm.id
+        '''
+        per_team: Dict[int, List[Tuple]] = {}
+        for key in self._partitions(since=since):
+            for team_id, *row in self._query(key, sql, params):
+                per_team.setdefault(team_id, []).append(tuple(row))
+        if not per_team:
+            return []
+
+        placeholders = ", ".join("?" * len(per_team))
+        names = {
+            team_id: (team, league_name)
+            for team_id, team, league_name in self._fetchall(f'''
+                SELECT tm.id, tm.name, l.name
+                FROM main.teams tm JOIN main.leagues l ON l.id = tm.league_id
+                WHERE tm.id IN ({placeholders})
+            ''', list(per_team))
+        }
 
+        teams = [
+            {"team": names[team_id][0], "league": names[team_id][1],
+             **self._stats_from_row(self._sum_rows(rows))}
+            for team_id, rows in per_team.items()
+        ]
+        teams.sort(key=lambda team: team["total_profit"], reverse=True)
+        return teams
+
+    def get_stats_matrix(self, windows: Iterable[int] = (7, 30, 90, 365)) -> Dict[int, Dict]:
+        """
+        Statystyki dla wielu okien x liga x typ zakladu w jednym skanie
+        (agregacja warunkowa - kazde okno to osobny zestaw kolumn).
+        Returns: {dni: {"total": stats,
+                        "leagues": {liga: {"total": stats, "bet_types": {kod: stats}}},
+                        "bet_types": {kod: stats}}}
+        """
+        windows = sorted(set(windows))
+        if not windows:
+            return {}
+        now = datetime.now()
+        sinces = [(now - timedelta(days=days)).strftime("%Y-%m-%d") for days in windows]
+        cells = self._cached(("matrix", tuple(sinces)), lambda: self._query_window_cells(sinces),
+                             self._partitions(since=min(sinces)))
+
+        matrix = {}
+        for i, days in enumerate(windows):
+            window = {"total": [], "leagues": {}, "bet_types": {}}
+            league_rows: Dict[str, List[Tuple]] = {}
+            bet_type_rows: Dict[str, List[Tuple]] = {}
+            for (league, bet_type), rows in cells.items():
+                row = rows[i]
+                if not row[0]:
+                    continue
+                window["total"].append(row)
+                league_rows.setdefault(league, []).append(row)
+                bet_type_rows.setdefault(bet_type, []).append(row)
+                league = window["leagues"].setdefault(league, {"bet_types": {}})
+                league["bet_types"][bet_type] = self._stats_from_row(row)
+
+            window["total"] = self._stats_from_row(self._sum_rows(window["total"]))
+            for league, rows in league_rows.items():
+                window["leagues"][league]["total"] = self._stats_from_row(self._sum_rows(rows))
+            for bet_type, rows in bet_type_rows.items():
+                window["bet_types"][bet_type] = self._stats_from_row(self._sum_rows(rows))
+            matrix[days] = window
+        return matrix
+
+    def _query_window_cells(self, sinces: List[str]) -> Dict[Tuple[str, str], List[Tuple]]:
+        """(liga, kod typu) -> wiersz (total, wins, losses, stake, profit) dla kazdego okna"""
+        columns = []
+        for i in range(1, len(sinces) + 1):
+            columns += [
+                f"SUM(t.date >= ?{i})",
+                f"SUM(t.date >= ?{i} AND t.result IN {self.WIN_RESULTS})",
+                f"SUM(t.date >= ?{i} AND t.result IN {self.LOSS_RESULTS})",
+                f"SUM(CASE WHEN t.date >= ?{i} THEN t.stake END)",
+                f"SUM(CASE WHEN t.date >= ?{i} THEN COALESCE(t.profit, 0) END)",
+            ]
+        # Najszersze okno (najwczesniejsza data) ogranicza skan
+        sql = f'''
+            SELECT l.name, t.bet_type, {", ".join(columns)}
+            FROM {{tips}} t
+            JOIN main.leagues l ON l.id = t.league_id
+            WHERE t.date >= ?{len(sinces) + 1} AND t.result IS NOT NULL
+            GROUP BY t.league_id, t.bet_type
+        '''
+        params = sinces + [min(sinces)]
+
+        per_cell: Dict[Tuple[str, str], List[Tuple]] = {}
+        for key in self._partitions(since=min(sinces)):
+            for league, bet_type, *values in self._query(key, sql, params):
+                per_cell.setdefault((league, bet_type), []).append(tuple(values))
+
+        cells = {}
+        for cell, rows in per_cell.items():
+            values = self._sum_rows(rows)
+            cells[cell] = [values[i:i + 5] for i in range(0, len(values), 5)]
+        return cells
+
+    def get_recent_tips(self, limit: int = 10) -> List[Dict]:
         columns = ['date', 'league', 'match', 'bet_type', 'odds', 'stake', 'confidence', 'result', 'profit']
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        rows = itertools.islice(self.iter_tips(page_size=max(limit, 1)), limit)
+        return [{column: getattr(row, column) for column in columns} for row in rows]
+
+    # Wiersze TipRow jednej partycji (nazwy z wymiarow w main)
+    TIP_ROWS_SQL = '''
+        SELECT * FROM (
+            SELECT
+                t.id, t.created_at, t.date, l.name AS league,
+                hteam.name || ' vs ' || ateam.name AS match,
+                t.bet_type, t.odds, t.stake, t.confidence, t.result, t.profit, t.reasoning
+            FROM {tips} t
+            JOIN main.leagues l ON l.id = t.league_id
+            JOIN main.matches m ON m.id = t.match_id
+            JOIN main.teams hteam ON hteam.id = m.home_team_id
+            JOIN main.teams ateam ON ateam.id = m.away_team_id
+        )
+    '''
+
+    def iter_tips(self, filter: Optional[TipFilter] = None,
+                  after_cursor: Optional[Tuple[str, int]] = None,
+                  page_size: int = 500) -> Iterator[TipRow]:
+        """
+        Strumieniuje historie od najnowszych typow, strona po stronie.
+        Paginacja keyset po (created_at, id) - kazda strona to osobne zapytanie
+        po indeksie, wiec pamiec nie rosnie z dlugoscia historii.
+        after_cursor: TipRow.cursor ostatniego widzianego wiersza
+        Przy shardach strumienie partycji z okna filtra sa scalane (heapq.merge).
+        """
+        filter = filter or TipFilter()
+        streams = [
+            self._iter_partition(key, filter, after_cursor, page_size)
+            for key in reversed(self._partitions(since=filter.since, until=filter.until))
+        ]
+        if len(streams) == 1:
+            yield from streams[0]
+        else:
+            yield from heapq.merge(*streams, key=lambda row: row.cursor, reverse=True)
+
+    def _iter_partition(self, key: str, filter: TipFilter,
+                        after_cursor: Optional[Tuple[str, int]], page_size: int) -> Iterator[TipRow]:
+        where, params = filter.to_sql()
+        cursor_pos = after_cursor
+
+        while True:
+            page_where = list(where)
+            page_params = list(params)
+            if cursor_pos is not None:
+                page_where.append("(created_at, id) < (?, ?)")
+                page_params.extend(cursor_pos)
+            sql_where = f"WHERE {' AND '.join(page_where)}" if page_where else ""
+
+            rows = self._query(key, f'''
+                {self.TIP_ROWS_SQL}
+                {sql_where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            ''', page_params + [page_size])
+
+            for row in rows:
+                yield TipRow._make(row)
+            if len(rows) < page_size:
+                return
+            cursor_pos = (rows[-1][1], rows[-1][0])
+
+    # ---- Kopie bazy w pamieci ----
+
+    def _load_snapshot(self, path: str):
+        """Wczytuje plik historii do bazy w pamieci (odczyty bez I/O dysku)"""
+        source = sqlite3.connect(path)
+        try:
+            with self.connection() as conn:
+                source.backup(conn)
+        finally:
+            source.close()
+
+    def snapshot(self, path: Optional[str] = None):
+        """
+        Zapisuje cala baze do pliku (backup API). Najpierw do pliku tymczasowego,
+        potem podmiana - przerwana kopia nie psuje poprzedniej.
+        Plik docelowy nie moze byc w tym czasie otwarty przez inny proces.
+        """
+        path = path or self.snapshot_path
+        if not path:
+            raise ValueError("Brak pliku kopii (snapshot_path)")
+
+        tmp_path = f"{path}.tmp"
+        target = sqlite3.connect(tmp_path)
+        try:
+            with self.connection() as conn:
+                conn.backup(target)
+        finally:
+            target.close()
+        # Stary WAL nalezy do poprzedniej kopii - SQLite odtworzylby go na nowej
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.replace(tmp_path, path)
+        self._last_snapshot = time.monotonic()
 
     def close(self):
-        self.conn.close()
+        if self._closed:
+            return
+        # Po zamknieciu :memory: nowe polaczenie widzialoby pusta baze
+        self._closed = True
+        if self.snapshot_path:
+            self.snapshot()
+        self.pool.close()
+        self._attached.clear()
+        self._stats_cache.clear()
+        with self._cache_lock:
+            for conn in self._version_conns.values():
+                conn.close()
+            self._version_conns.clear()
+
+
+class TipWriter:
+    """
+    Zapis typow w tle (write-behind).
+    Osobny watek oproznia ograniczona kolejke i zapisuje typy partiami
+    (jedna transakcja na partie przez Database.save_tips).
+
+    Trwalosc: Future z submit() konczy sie id wiersza dopiero po commicie
+    partii - wtedy typ jest trwaly wg profilu PRAGMA bazy. flush() czeka
+    na commit wszystkiego, co przyjeto do kolejki.
+    Backpressure: przy pelnej kolejce submit() blokuje (albo rzuca
+    queue.Full po `timeout`).
+    """
+
+    _STOP = object()
+
+    def __init__(self, db: Database, max_queue: int = 1000, batch_size: int = 200):
+        self.db = db
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        # Typy przyjete, ale jeszcze nie zapisane (flush czeka na 0)
+        self._unfinished = 0
+        self._done = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="TipWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, tip: BettingTip, timeout: Optional[float] = None) -> Future:
+        """Dodaje typ do kolejki. Returns: Future z id wiersza po commicie"""
+        if self._closed:
+            raise RuntimeError("TipWriter jest zamkniety")
+        future = Future()
+        with self._done:
+            self._unfinished += 1
+        try:
+            self._queue.put((tip, future), timeout=timeout)
+        except queue.Full:
+            self._finish(1)
+            raise
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Czeka az wszystkie przyjete typy zostana zapisane. Returns: False po timeout"""
+        with self._done:
+            return self._done.wait_for(lambda: not self._unfinished, timeout)
+
+    def _finish(self, count: int):
+        with self._done:
+            self._unfinished -= count
+            if not self._unfinished:
+                self._done.notify_all()
+
+    @staticmethod
+    def wait_durable(futures: Iterable[Future], timeout: Optional[float] = None) -> List[int]:
+        """Czeka na commit konkretnych typow. Returns: id wierszy"""
+        return [future.result(timeout=timeout) for future in futures]
+
+    def close(self):
+        """Zapisuje reszte kolejki i zatrzymuje watek"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            self._finish(len(batch))
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple[BettingTip, Future]]):
+        try:
+            ids = self.db.save_tips(tip for tip, _ in batch)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), tip_id in zip(batch, ids):
+                future.set_result(tip_id)
 
 
 # ============================================
 # ANALIZA MECZOW
 # ============================================
 
+class LRUCache:
+    """
+    Cache z limitem wpisow - przy przepelnieniu wypada najdawniej uzyty.
+    Bez blokady: wspoldzielony przez watki (TipGenerator) co najwyzej
+    policzy wartosc dwa razy.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, build: Callable):
+        """Wartosc dla `key`; przy braku liczy ja build() i zapamietuje"""
+        value = self._data.get(key)
+        if value is not None:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                # Inny watek usunal wpis miedzy get a move_to_end - wynik i tak jest dobry
+                pass
+            return value
+
+        value = build()
+        self._data[key] = value
+        if len(self._data) > self.size:
+            try:
+                self._data.popitem(last=False)
+            except KeyError:
+                # Inny watek wlasnie oproznil cache
+                pass
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TeamFeatures(NamedTuple):
+    """Cechy druzyny liczone raz (zamiast wlasciwosci TeamStats przy kazdym odczycie)"""
+    name: str
+    position: int
+    form_score: float
+    goals_per_game: float
+    conceded_per_game: float
+    injured: int
+
+
+class MatchFeatures(NamedTuple):
+    """Cechy meczu czytane przez analizatory"""
+    home: TeamFeatures
+    away: TeamFeatures
+    expected_goals: float  # srednia goli modelu over/under (z H2H)
+
+
+class MatchModel(NamedTuple):
+    """Czesc analizy MatchAnalyzer niezalezna od kursow (cache miedzy zmianami kursow)"""
+    home_mod: float   # modyfikatory 1X2 - baza to kursy
+    away_mod: float
+    btts_prob: float
+    over_25_prob: float
+    over_35_prob: float
+    reasons: Dict[BetType, List[Reason]]
+
+
+class FeatureExtractor:
+    """Wyciaga cechy meczow; cechy druzyn w cache wg TeamStats.version (LRU)"""
+
+    CACHE_SIZE = 4096
+
+    def __init__(self):
+        self._teams = LRUCache(self.CACHE_SIZE)
+
+    def team(self, team: TeamStats) -> TeamFeatures:
+        return self._teams.get(team.version, lambda: TeamFeatures(
+            team.name,
+            team.position,
+            team.form_score,
+            team.goals_per_game,
+            team.conceded_per_game,
+            len(team.injuries),
+        ))
+
+    def match(self, match: Match) -> MatchFeatures:
+        home = self.team(match.home_team)
+        away = self.team(match.away_team)
+
+        # Oczekiwana liczba goli
+        expected_goals = (
+            home.goals_per_game +
+            away.goals_per_game +
+            home.conceded_per_game * 0.3 +
+            away.conceded_per_game * 0.3
+        ) / 2
+        # H2H gole
+        if match.h2h_total_goals > 0:
+            expected_goals = (expected_goals + match.h2h_total_goals) / 2
+
+        return MatchFeatures(home, away, expected_goals)
+
+
+class EloRatings:
+    """
+    Ranking Elo druzyn aktualizowany wynik po wyniku (K z poprawka na roznice goli).
+    Klucz to (liga, druzyna) - jak w bazie. Odczyt to jeden dict.get.
+    """
+
+    INITIAL = 1500.0
+    K = 20.0
+    HOME_ADVANTAGE = 60.0   # punkty Elo gospodarza w oczekiwanym wyniku
+
+    def __init__(self):
+        self.ratings: Dict[Tuple[str, str], float] = {}
+        self.games: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ratings)
+
+    def get(self, league: str, team: str) -> float:
+        return self.ratings.get((league, team), self.INITIAL)
+
+    def find(self, league: str, team: str) -> Optional[float]:
+        """Ranking albo None, gdy druzyna nie ma jeszcze wynikow"""
+        return self.ratings.get((league, team))
+
+    def expected(self, home_rating: float, away_rating: float) -> float:
+        """Oczekiwany wynik gospodarzy (1 - wygrana, 0.5 - remis)"""
+        return 1 / (1 + 10 ** ((away_rating - home_rating - self.HOME_ADVANTAGE) / 400))
+
+    @staticmethod
+    def margin(goal_diff: int) -> float:
+        """Mnoznik K za roznice goli (jak w World Football Elo)"""
+        goal_diff = abs(goal_diff)
+        if goal_diff <= 1:
+            return 1.0
+        if goal_diff == 2:
+            return 1.5
+        return (11 + goal_diff) / 8
+
+    def update(self, league: str, home: str, away: str,
+               home_goals: int, away_goals: int) -> float:
+        """Uwzglednia jeden wynik; zwraca zmiane rankingu gospodarzy"""
+        before = self.get(league, home)
+        self.replay([(league, home, away, home_goals, away_goals)])
+        return self.ratings[(league, home)] - before
+
+    def replay(self, results: Iterable[Tuple[str, str, str, int, int]]) -> int:
+        """
+        Odtwarza rankingi z wynikow (liga, gospodarz, gosc, gole, gole)
+        w kolejnosci chronologicznej. Petla na zmiennych lokalnych - bez wywolan
+        metod na wynik. Returns: liczba wynikow
+        """
+        ratings, games = self.ratings, self.games
+        initial, k, home_advantage = self.INITIAL, self.K, self.HOME_ADVANTAGE
+        margins = [self.margin(diff) for diff in range(11)]
+        last_margin = len(margins) - 1
+        count = 0
+        for league, home, away, home_goals, away_goals in results:
+            home_key, away_key = (league, home), (league, away)
+            home_rating = ratings.get(home_key, initial)
+            away_rating = ratings.get(away_key, initial)
+            expected = 1 / (1 + 10 ** ((away_rating - home_rating - home_advantage) / 400))
+            diff = home_goals - away_goals
+            score = 1.0 if diff > 0 else (0.5 if diff == 0 else 0.0)
+            goal_diff = diff if diff >= 0 else -diff
+            multiplier = margins[goal_diff] if goal_diff <= last_margin else self.margin(goal_diff)
+            delta = k * multiplier * (score - expected)
+            ratings[home_key] = home_rating + delta
+            ratings[away_key] = away_rating - delta
+            games[home_key] = games.get(home_key, 0) + 1
+            games[away_key] = games.get(away_key, 0) + 1
+            count += 1
+        return count
+
+    @staticmethod
+    def read_csv(path: str) -> List[Tuple[str, str, str, int, int]]:
+        """
+        Wyniki z CSV (naglowek: date, league, home, away, home_goals, away_goals)
+        posortowane po dacie - gotowe do replay()
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            date, league, home, away, home_goals, away_goals = (
+                header.index(column)
+                for column in ("date", "league", "home", "away", "home_goals", "away_goals"))
+            rows = [(row[date], row[league], row[home], row[away], int(row[home_goals]), int(row[away_goals]))
+                    for row in reader]
+        # Stabilnie - mecze z tego samego dnia w kolejnosci z pliku
+        rows.sort(key=lambda row: row[0])
+        return [row[1:] for row in rows]
+
+    def rows(self) -> Iterator[Tuple[str, str, float, int]]:
+        for (league, team), rating in self.ratings.items():
+            yield league, team, rating, self.games.get((league, team), 0)
+
+    @classmethod
+    def load(cls, db: "Database") -> "EloRatings":
+        ratings = cls()
+        for league, team, rating, games in db.load_ratings():
+            ratings.ratings[(league, team)] = rating
+            ratings.games[(league, team)] = games
+        return ratings
+
+    def save(self, db: "Database", replace_all: bool = False, rated: Iterable[Match] = ()) -> int:
+        return db.save_ratings(self.rows(), replace_all, rated)
+
+
 class MatchAnalyzer:
     """Analizator meczow - oblicza prawdopodobienstwa i value"""
 
@@ -331,80 +2536,337 @@ class MatchAnalyzer:
         "motivation": 0.05,
     }
 
-    def analyze(self, match: Match) -> Dict[BetType, Tuple[float, float, List[str]]]:
+    # Modele meczow (czesc niezalezna od kursow) trzymane w cache
+    MODEL_CACHE_SIZE = 16384
+
+    # Roznica rankingow Elo odpowiadajaca roznicy 5 (i 3 - remis) miejsc w tabeli
+    RATING_GAP = 100
+    RATING_DRAW_GAP = 60
+
+    def __init__(self, features: Optional[FeatureExtractor] = None,
+                 ratings: Optional[EloRatings] = None):
         """
-        Analizuje mecz i zwraca prawdopodobienstwa dla kazdego typu zakladu.
+        features: wspolny ekstraktor cech (np. dla kilku analizatorow)
+        ratings: ranking Elo zamiast pozycji w tabeli (dla meczow, w ktorych obie druzyny go maja)
+        """
+        self.features = features or FeatureExtractor()
+        self.ratings = ratings
+        self._models = LRUCache(self.MODEL_CACHE_SIZE)
+
+    def analyze(self, match: Match) -> Dict[BetType, Tuple[float, float, List[Reason]]]:
+        """
+        Analizuje mecz i zwraca prawdopodobienstwa dla kazdego typu zakladu
+        (model liczony od nowa; z cache modeli korzysta TipGenerator.rescore).
         Returns: {BetType: (probability, value, [reasons])}
         """
-        results = {}
+        return self.price(match, self._build_model(match))
+
+    def close(self):
+        """Zwalnia zasoby analizatora (pula procesow w EnsembleAnalyzer)"""
+
+    def __getstate__(self):
+        # Kopia do procesu roboczego EnsembleAnalyzer - bez cache modeli i cech
+        state = self.__dict__.copy()
+        state["features"] = FeatureExtractor()
+        state["_models"] = LRUCache(self.MODEL_CACHE_SIZE)
+        return state
+
+    def model(self, match: Match) -> MatchModel:
+        """Model meczu z cache (LRU) - klucz to wersje statystyk druzyn i H2H, bez kursow"""
+        key = (match.home_team.version, match.away_team.version, match.h2h_home_wins,
+               match.h2h_draws, match.h2h_away_wins, match.h2h_total_goals,
+               self._match_ratings(match))
+        return self._models.get(key, lambda: self._build_model(match))
+
+    def _build_model(self, match: Match) -> MatchModel:
+        features = self.features.match(match)
+
+        # 1. Modyfikatory 1X2 (baza z kursow dopiero w price)
+        home_mod, away_mod, reasons_1x2 = self._model_1x2(match, features)
+        # 2. BTTS
+        btts_prob, btts_reasons = self._analyze_btts(match, features)
+        # 3. Over/Under
+        over_25_prob, over_reasons = self._analyze_over_under(match, 2.5, features)
+        # Ta sama srednia goli - bez powodow, ktore i tak bylyby odrzucone
+        over_35_prob = self._over_probability(features.expected_goals, 3.5)
+
+        reasons = {
+            BetType.HOME_WIN: reasons_1x2["home"],
+            BetType.DRAW: reasons_1x2["draw"],
+            BetType.AWAY_WIN: reasons_1x2["away"],
+            BetType.HOME_OR_DRAW: reasons_1x2["home"] + [Reason("draw_cover")],
+            BetType.AWAY_OR_DRAW: reasons_1x2["away"] + [Reason("draw_cover")],
+            BetType.BTTS_YES: btts_reasons,
+            BetType.BTTS_NO: [Reason("btts_no")],
+            BetType.OVER_25: over_reasons,
+            BetType.UNDER_25: [Reason("under")],
+            BetType.OVER_35: [Reason("over_35")],
+        }
+        return MatchModel(home_mod, away_mod, btts_prob, over_25_prob, over_35_prob, reasons)
 
-        # 1. Analiza 1X2
-        home_prob, draw_prob, away_prob, reasons_1x2 = self._analyze_1x2(match)
+    def price(self, match: Match, model: MatchModel) -> Dict[BetType, Tuple[float, float, List[Reason]]]:
+        """Wycena modelu po biezacych kursach: prawdopodobienstwa 1X2 i value (tanie)"""
+        results = {}
+        reasons = model.reasons
+        home_prob, draw_prob, away_prob = self._price_1x2(match, model.home_mod, model.away_mod)
 
         # Oblicz value dla kazdego wyniku
         if match.odds_home > 0:
             implied_home = 1 / match.odds_home
             value_home = home_prob - implied_home
-            results[BetType.HOME_WIN] = (home_prob, value_home, reasons_1x2["home"])
+            results[BetType.HOME_WIN] = (home_prob, value_home, reasons[BetType.HOME_WIN])
 
         if match.odds_draw > 0:
             implied_draw = 1 / match.odds_draw
             value_draw = draw_prob - implied_draw
-            results[BetType.DRAW] = (draw_prob, value_draw, reasons_1x2["draw"])
+            results[BetType.DRAW] = (draw_prob, value_draw, reasons[BetType.DRAW])
 
         if match.odds_away > 0:
             implied_away = 1 / match.odds_away
             value_away = away_prob - implied_away
-            results[BetType.AWAY_WIN] = (away_prob, value_away, reasons_1x2["away"])
+            results[BetType.AWAY_WIN] = (away_prob, value_away, reasons[BetType.AWAY_WIN])
 
         # Double chance
         results[BetType.HOME_OR_DRAW] = (
             home_prob + draw_prob,
             0,  # Value obliczony osobno
-            reasons_1x2["home"] + ["Zabezpieczenie remisem"]
+            reasons[BetType.HOME_OR_DRAW]
         )
         results[BetType.AWAY_OR_DRAW] = (
             away_prob + draw_prob,
             0,
-            reasons_1x2["away"] + ["Zabezpieczenie remisem"]
+            reasons[BetType.AWAY_OR_DRAW]
         )
 
-        # 2. Analiza BTTS
-        btts_prob, btts_reasons = self._analyze_btts(match)
+        # BTTS
         if match.odds_btts_yes > 0:
             implied_btts = 1 / match.odds_btts_yes
-            value_btts = btts_prob - implied_btts
-            results[BetType.BTTS_YES] = (btts_prob, value_btts, btts_reasons)
-        results[BetType.BTTS_NO] = (1 - btts_prob, 0, ["Slabe ataki lub mocne obrony"])
+            value_btts = model.btts_prob - implied_btts
+            results[BetType.BTTS_YES] = (model.btts_prob, value_btts, reasons[BetType.BTTS_YES])
+        results[BetType.BTTS_NO] = (1 - model.btts_prob, 0, reasons[BetType.BTTS_NO])
 
-        # 3. Analiza Over/Under
-        over_25_prob, over_reasons = self._analyze_over_under(match, 2.5)
+        # Over/Under
         if match.odds_over_25 > 0:
             implied_over = 1 / match.odds_over_25
-            value_over = over_25_prob - implied_over
-            results[BetType.OVER_25] = (over_25_prob, value_over, over_reasons)
-        results[BetType.UNDER_25] = (1 - over_25_prob, 0, ["Defensywne nastawienie druzyn"])
+            value_over = model.over_25_prob - implied_over
+            results[BetType.OVER_25] = (model.over_25_prob, value_over, reasons[BetType.OVER_25])
+        results[BetType.UNDER_25] = (1 - model.over_25_prob, 0, reasons[BetType.UNDER_25])
+        results[BetType.OVER_35] = (model.over_35_prob, 0, reasons[BetType.OVER_35])
 
-        over_35_prob, _ = self._analyze_over_under(match, 3.5)
-        results[BetType.OVER_35] = (over_35_prob, 0, ["Bardzo ofensywne druzyny"])
+        return results
 
+    @staticmethod
+    def _price_markets(match: Match, markets: Iterable[Tuple[BetType, float, List[Reason]]]) -> Dict:
+        """Rynki BetType (typ, prob, powody): z kursem w Match tylko gdy kurs jest, value wzgledem niego"""
+        results = {}
+        for bet_type, prob, reasons in markets:
+            field_name = ODDS_MARKETS.get(bet_type.code)
+            if field_name is None:
+                results[bet_type] = (prob, 0, reasons)
+                continue
+            odds = getattr(match, field_name)
+            if odds > 0:
+                results[bet_type] = (prob, prob - 1 / odds, reasons)
         return results
 
-    def _analyze_1x2(self, match: Match) -> Tuple[float, float, float, Dict]:
+    # Ponizej tylu meczow narzut budowania tablic przewaza nad zyskiem
+    BATCH_MIN_SIZE = 32
+
+    def analyze_batch(self, matches: Iterable[Match]) -> List[Dict[BetType, Tuple[float, float, List[Reason]]]]:
+        """
+        analyze() dla wielu meczow naraz. Z NumPy prawdopodobienstwa i value
+        wszystkich rynkow liczone sa wektorowo, w tej samej kolejnosci dzialan
+        co sciezka skalarna (wyniki identyczne); powody jako LazyReasons.
+        Bez NumPy - petla po analyze().
+        """
+        matches = list(matches)
+        if np is None or len(matches) < self.BATCH_MIN_SIZE:
+            return [self.analyze(match) for match in matches]
+
+        homes = [match.home_team for match in matches]
+        aways = [match.away_team for match in matches]
+
+        def column(values) -> "np.ndarray":
+            return np.array(values, dtype=np.float64)
+
+        # Cechy druzyn z cache ekstraktora (liczone raz na wersje statystyk)
+        home_features = [self.features.team(team) for team in homes]
+        away_features = [self.features.team(team) for team in aways]
+        (_, home_pos, home_form, home_scores, home_concedes, home_injuries) = map(list, zip(*home_features))
+        (_, away_pos, away_form, away_scores, away_concedes, away_injuries) = map(list, zip(*away_features))
+        h2h_home = [match.h2h_home_wins for match in matches]
+        h2h_draws = [match.h2h_draws for match in matches]
+        h2h_away = [match.h2h_away_wins for match in matches]
+        h2h_goals = [match.h2h_total_goals for match in matches]
+
+        match_ratings = [self._match_ratings(match) for match in matches]
+        rated = np.array([ratings is not None for ratings in match_ratings])
+        home_rating = column([ratings[0] if ratings else 0.0 for ratings in match_ratings])
+        away_rating = column([ratings[1] if ratings else 0.0 for ratings in match_ratings])
+
+        hf, af = column(home_form), column(away_form)
+        hp, ap = column(home_pos), column(away_pos)
+        hs, as_ = column(home_scores), column(away_scores)
+        hc, ac = column(home_concedes), column(away_concedes)
+        odds_home = column([match.odds_home for match in matches])
+        odds_draw = column([match.odds_draw for match in matches])
+        odds_away = column([match.odds_away for match in matches])
+        odds_btts = column([match.odds_btts_yes for match in matches])
+        odds_over = column([match.odds_over_25 for match in matches])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # ---- 1X2 (jak _analyze_1x2) ----
+            has_odds = (odds_home != 0) & (odds_draw != 0) & (odds_away != 0)
+            total = 1/odds_home + 1/odds_draw + 1/odds_away
+            base_home = np.where(has_odds, (1/odds_home) / total, 0.45)
+            base_draw = np.where(has_odds, (1/odds_draw) / total, 0.25)
+            base_away = np.where(has_odds, (1/odds_away) / total, 0.30)
+
+            home_mod = np.zeros(len(matches))
+            away_mod = np.zeros(len(matches))
+
+            form_diff = hf - af
+            form_home = form_diff > 0.2
+            form_away = ~form_home & (form_diff < -0.2)
+            home_mod += np.where(form_home, 0.08, 0.0)
+            away_mod += np.where(form_away, 0.08, 0.0)
+
+            home_mod += 0.05
+
+            # Ranking Elo tam, gdzie obie druzyny go maja - inaczej pozycja
+            pos_diff = np.where(rated, home_rating - away_rating, ap - hp)
+            gap = np.where(rated, self.RATING_GAP, 5)
+            pos_home = pos_diff > gap
+            pos_away = ~pos_home & (pos_diff < -gap)
+            home_mod += np.where(pos_home, 0.06, 0.0)
+            away_mod += np.where(pos_away, 0.06, 0.0)
+
+            total_h2h = column(h2h_home) + column(h2h_draws) + column(h2h_away)
+            has_h2h = total_h2h > 0
+            h2h_home_fav = has_h2h & (column(h2h_home) / total_h2h > 0.5)
+            h2h_away_fav = has_h2h & ~h2h_home_fav & (column(h2h_away) / total_h2h > 0.5)
+            home_mod += np.where(h2h_home_fav, 0.04, 0.0)
+            away_mod += np.where(h2h_away_fav, 0.04, 0.0)
+
+            home_goal_diff = hs - hc
+            away_goal_diff = as_ - ac
+            goals_home = home_goal_diff > away_goal_diff + 0.5
+            goals_away = ~goals_home & (away_goal_diff > home_goal_diff + 0.5)
+            home_mod += np.where(goals_home, 0.05, 0.0)
+            away_mod += np.where(goals_away, 0.05, 0.0)
+
+            home_injured = column(home_injuries) > 2
+            away_injured = column(away_injuries) > 2
+            home_mod -= np.where(home_injured, 0.04, 0.0)
+            away_mod -= np.where(away_injured, 0.04, 0.0)
+
+            home_prob = np.minimum(0.85, np.maximum(0.10, base_home + home_mod - away_mod * 0.5))
+            away_prob = np.minimum(0.85, np.maximum(0.10, base_away + away_mod - home_mod * 0.5))
+            draw_prob = 1 - home_prob - away_prob
+            draw_prob = np.minimum(0.40, np.maximum(0.15, draw_prob))
+
+            total = home_prob + draw_prob + away_prob
+            home_prob /= total
+            draw_prob /= total
+            away_prob /= total
+
+            # ---- BTTS (jak _analyze_btts) ----
+            prob_home_scores = np.minimum(0.95, (hs + ac) / 3)
+            prob_away_scores = np.minimum(0.95, (as_ + hc) / 3)
+            btts_prob = prob_home_scores * prob_away_scores
+
+            # ---- Over/Under (jak _analyze_over_under) ----
+            goals = column(h2h_goals)
+            expected_goals = (hs + as_ + hc * 0.3 + ac * 0.3) / 2
+            expected_goals = np.where(goals > 0, (expected_goals + goals) / 2, expected_goals)
+
+            def over_prob(line: float) -> "np.ndarray":
+                prob = np.where(expected_goals > line,
+                                0.5 + (expected_goals - line) * 0.15,
+                                0.5 - (line - expected_goals) * 0.15)
+                return np.minimum(0.85, np.maximum(0.15, prob))
+
+            over_25 = over_prob(2.5)
+            over_35 = over_prob(3.5)
+
+            value_home = home_prob - 1 / odds_home
+            value_draw = draw_prob - 1 / odds_draw
+            value_away = away_prob - 1 / odds_away
+            value_btts = btts_prob - 1 / odds_btts
+            value_over = over_25 - 1 / odds_over
+
+        # Floaty Pythona (jak w sciezce skalarnej)
+        (home_prob, draw_prob, away_prob, btts_prob, over_25, over_35, value_home, value_draw,
+         value_away, value_btts, value_over, odds_home, odds_draw, odds_away, odds_btts,
+         odds_over) = (
+            array.tolist() for array in (
+                home_prob, draw_prob, away_prob, btts_prob, over_25, over_35, value_home,
+                value_draw, value_away, value_btts, value_over, odds_home, odds_draw,
+                odds_away, odds_btts, odds_over))
+
+        # Powody bez parametrow sa niezmienne - wspolne dla wszystkich meczow
+        btts_no, under, over_35_reason = [Reason("btts_no")], [Reason("under")], [Reason("over_35")]
+
+        results = []
+        for i, match in enumerate(matches):
+            # Rynki w tej samej kolejnosci co analyze() (wazne przy remisach w sortowaniu);
+            # powody dopiero na zadanie - z modelu meczu
+            result = {}
+            if odds_home[i] > 0:
+                result[BetType.HOME_WIN] = (home_prob[i], value_home[i],
+                                            LazyReasons(self._reasons, match, BetType.HOME_WIN))
+            if odds_draw[i] > 0:
+                result[BetType.DRAW] = (draw_prob[i], value_draw[i],
+                                        LazyReasons(self._reasons, match, BetType.DRAW))
+            if odds_away[i] > 0:
+                result[BetType.AWAY_WIN] = (away_prob[i], value_away[i],
+                                            LazyReasons(self._reasons, match, BetType.AWAY_WIN))
+            result[BetType.HOME_OR_DRAW] = (
+                home_prob[i] + draw_prob[i], 0, LazyReasons(self._reasons, match, BetType.HOME_OR_DRAW)
+            )
+            result[BetType.AWAY_OR_DRAW] = (
+                away_prob[i] + draw_prob[i], 0, LazyReasons(self._reasons, match, BetType.AWAY_OR_DRAW)
+            )
+            if odds_btts[i] > 0:
+                result[BetType.BTTS_YES] = (btts_prob[i], value_btts[i],
+                                            LazyReasons(self._reasons, match, BetType.BTTS_YES))
+            result[BetType.BTTS_NO] = (1 - btts_prob[i], 0, list(btts_no))
+            if odds_over[i] > 0:
+                result[BetType.OVER_25] = (over_25[i], value_over[i],
+                                           LazyReasons(self._reasons, match, BetType.OVER_25))
+            result[BetType.UNDER_25] = (1 - over_25[i], 0, list(under))
+            result[BetType.OVER_35] = (over_35[i], 0, list(over_35_reason))
+            results.append(result)
+
+        return results
+
+    def _reasons(self, match: Match, bet_type: BetType) -> List[Reason]:
+        """Powody jednego rynku (materializacja LazyReasons z analyze_batch)"""
+        return self.model(match).reasons[bet_type]
+
+    def _analyze_1x2(self, match: Match, features: MatchFeatures) -> Tuple[float, float, float, Dict]:
         """Analiza prawdopodobienstw 1X2"""
-        home = match.home_team
-        away = match.away_team
+        home_mod, away_mod, reasons = self._model_1x2(match, features)
+        home_prob, draw_prob, away_prob = self._price_1x2(match, home_mod, away_mod)
+        return home_prob, draw_prob, away_prob, reasons
 
-        reasons = {"home": [], "draw": [], "away": []}
+    def _match_ratings(self, match: Match) -> Optional[Tuple[float, float]]:
+        """Rankingi Elo (gospodarze, goscie) albo None - wtedy liczy sie pozycja w tabeli"""
+        if self.ratings is None:
+            return None
+        league = match.league.league_name
+        home = self.ratings.find(league, match.home_team.name)
+        away = self.ratings.find(league, match.away_team.name)
+        if home is None or away is None:
+            return None
+        return home, away
 
-        # Bazowe prawdopodobienstwa na podstawie kursow
-        if match.odds_home and match.odds_draw and match.odds_away:
-            total = 1/match.odds_home + 1/match.odds_draw + 1/match.odds_away
-            base_home = (1/match.odds_home) / total
-            base_draw = (1/match.odds_draw) / total
-            base_away = (1/match.odds_away) / total
-        else:
-            base_home, base_draw, base_away = 0.45, 0.25, 0.30
+    def _model_1x2(self, match: Match, features: MatchFeatures) -> Tuple[float, float, Dict]:
+        """Modyfikatory 1X2 i powody - bez kursow"""
+        home = features.home
+        away = features.away
+
+        reasons = {"home": [], "draw": [], "away": []}
 
         # Modyfikatory
         home_mod = 0
@@ -414,23 +2876,34 @@ class MatchAnalyzer:
         form_diff = home.form_score - away.form_score
         if form_diff > 0.2:
             home_mod += 0.08
-            reasons["home"].append(f"Lepsza forma: {home.form_score:.0%} vs {away.form_score:.0%}")
+            reasons["home"].append(Reason("form_home", (home.form_score, away.form_score)))
         elif form_diff < -0.2:
             away_mod += 0.08
-            reasons["away"].append(f"Lepsza forma gosci: {away.form_score:.0%}")
+            reasons["away"].append(Reason("form_away", (away.form_score,)))
 
         # 2. Przewaga wlasnego boiska (15%)
         home_mod += 0.05
-        reasons["home"].append("Przewaga wlasnego boiska")
-
-        # 3. Pozycja w tabeli (15%)
-        pos_diff = away.position - home.position
-        if pos_diff > 5:
-            home_mod += 0.06
-            reasons["home"].append(f"Wyzsza pozycja w tabeli ({home.position} vs {away.position})")
-        elif pos_diff < -5:
-            away_mod += 0.06
-            reasons["away"].append(f"Wyzsza pozycja gosci ({away.position})")
+        reasons["home"].append(Reason("home_advantage"))
+
+        # 3. Sila druzyn (15%): ranking Elo, a bez niego pozycja w tabeli
+        ratings = self._match_ratings(match)
+        if ratings is not None:
+            home_rating, away_rating = ratings
+            rating_diff = home_rating - away_rating
+            if rating_diff > self.RATING_GAP:
+                home_mod += 0.06
+                reasons["home"].append(Reason("rating_home", ratings))
+            elif rating_diff < -self.RATING_GAP:
+                away_mod += 0.06
+                reasons["away"].append(Reason("rating_away", (away_rating,)))
+        else:
+            pos_diff = away.position - home.position
+            if pos_diff > 5:
+                home_mod += 0.06
+                reasons["home"].append(Reason("position_home", (home.position, away.position)))
+            elif pos_diff < -5:
+                away_mod += 0.06
+                reasons["away"].append(Reason("position_away", (away.position,)))
 
         # 4. H2H (15%)
         total_h2h = match.h2h_home_wins + match.h2h_draws + match.h2h_away_wins
@@ -439,28 +2912,51 @@ class MatchAnalyzer:
             h2h_away_rate = match.h2h_away_wins / total_h2h
             if h2h_home_rate > 0.5:
                 home_mod += 0.04
-                reasons["home"].append(f"Korzystne H2H: {match.h2h_home_wins}W-{match.h2h_draws}D-{match.h2h_away_wins}L")
+                reasons["home"].append(Reason("h2h_home", (match.h2h_home_wins, match.h2h_draws, match.h2h_away_wins)))
             elif h2h_away_rate > 0.5:
                 away_mod += 0.04
-                reasons["away"].append(f"Korzystne H2H dla gosci")
+                reasons["away"].append(Reason("h2h_away"))
 
         # 5. Bilans bramkowy (15%)
         home_goal_diff = home.goals_per_game - home.conceded_per_game
         away_goal_diff = away.goals_per_game - away.conceded_per_game
         if home_goal_diff > away_goal_diff + 0.5:
             home_mod += 0.05
-            reasons["home"].append(f"Lepszy bilans bramkowy: {home_goal_diff:+.1f} vs {away_goal_diff:+.1f}")
+            reasons["home"].append(Reason("goal_diff_home", (home_goal_diff, away_goal_diff)))
         elif away_goal_diff > home_goal_diff + 0.5:
             away_mod += 0.05
-            reasons["away"].append(f"Lepszy bilans bramkowy gosci")
+            reasons["away"].append(Reason("goal_diff_away"))
 
         # 6. Kontuzje (10%)
-        if len(home.injuries) > 2:
+        if home.injured > 2:
             home_mod -= 0.04
-            reasons["away"].append(f"Kontuzje gospodarzy: {len(home.injuries)} graczy")
-        if len(away.injuries) > 2:
+            reasons["away"].append(Reason("injuries_home", (home.injured,)))
+        if away.injured > 2:
             away_mod -= 0.04
-            reasons["home"].append(f"Kontuzje gosci: {len(away.injuries)} graczy")
+            reasons["home"].append(Reason("injuries_away", (away.injured,)))
+
+        # Powody dla remisu
+        if abs(home.form_score - away.form_score) < 0.1:
+            reasons["draw"].append(Reason("draw_form"))
+        if ratings is not None:
+            if abs(ratings[0] - ratings[1]) <= self.RATING_DRAW_GAP:
+                reasons["draw"].append(Reason("draw_rating"))
+        elif abs(home.position - away.position) <= 3:
+            reasons["draw"].append(Reason("draw_position"))
+
+        return home_mod, away_mod, reasons
+
+    @staticmethod
+    def _price_1x2(match: Match, home_mod: float, away_mod: float) -> Tuple[float, float, float]:
+        """Prawdopodobienstwa 1X2: baza z kursow + modyfikatory modelu"""
+        # Bazowe prawdopodobienstwa na podstawie kursow
+        if match.odds_home and match.odds_draw and match.odds_away:
+            total = 1/match.odds_home + 1/match.odds_draw + 1/match.odds_away
+            base_home = (1/match.odds_home) / total
+            base_draw = (1/match.odds_draw) / total
+            base_away = (1/match.odds_away) / total
+        else:
+            base_home, base_draw, base_away = 0.45, 0.25, 0.30
 
         # Oblicz finalne prawdopodobienstwa
         home_prob = min(0.85, max(0.10, base_home + home_mod - away_mod * 0.5))
@@ -474,18 +2970,12 @@ class MatchAnalyzer:
         draw_prob /= total
         away_prob /= total
 
-        # Powody dla remisu
-        if abs(home.form_score - away.form_score) < 0.1:
-            reasons["draw"].append("Wyrownane formy druzyn")
-        if abs(home.position - away.position) <= 3:
-            reasons["draw"].append("Podobne pozycje w tabeli")
-
-        return home_prob, draw_prob, away_prob, reasons
+        return home_prob, draw_prob, away_prob
 
-    def _analyze_btts(self, match: Match) -> Tuple[float, List[str]]:
+    def _analyze_btts(self, match: Match, features: MatchFeatures) -> Tuple[float, List[Reason]]:
         """Analiza prawdopodobienstwa BTTS"""
-        home = match.home_team
-        away = match.away_team
+        home = features.home
+        away = features.away
         reasons = []
 
         # Bazowe prawdopodobienstwo
@@ -504,50 +2994,413 @@ class MatchAnalyzer:
         btts_prob = prob_home_scores * prob_away_scores
 
         if home_scores > 1.5:
-            reasons.append(f"{home.name} strzela srednio {home_scores:.1f} gola/mecz")
+            reasons.append(Reason("team_scores", (home.name, home_scores)))
         if away_scores > 1.3:
-            reasons.append(f"{away.name} strzela srednio {away_scores:.1f} gola/mecz")
+            reasons.append(Reason("team_scores", (away.name, away_scores)))
         if home_concedes > 1.2:
-            reasons.append(f"{home.name} traci srednio {home_concedes:.1f} gola/mecz")
+            reasons.append(Reason("team_concedes", (home.name, home_concedes)))
         if away_concedes > 1.2:
-            reasons.append(f"{away.name} traci srednio {away_concedes:.1f} gola/mecz")
+            reasons.append(Reason("team_concedes", (away.name, away_concedes)))
 
         return btts_prob, reasons
 
-    def _analyze_over_under(self, match: Match, line: float) -> Tuple[float, List[str]]:
+    def _analyze_over_under(self, match: Match, line: float,
+                            features: MatchFeatures) -> Tuple[float, List[Reason]]:
         """Analiza Over/Under"""
-        home = match.home_team
-        away = match.away_team
+        home = features.home
+        away = features.away
         reasons = []
 
-        # Oczekiwana liczba goli
-        expected_goals = (
-            home.goals_per_game +
-            away.goals_per_game +
-            home.conceded_per_game * 0.3 +
-            away.conceded_per_game * 0.3
-        ) / 2
+        # Oczekiwana liczba goli (z H2H) - z cech meczu
+        expected_goals = features.expected_goals
+        if match.h2h_total_goals > 0 and match.h2h_total_goals > line:
+            reasons.append(Reason("h2h_goals", (match.h2h_total_goals,)))
 
-        # H2H gole
-        if match.h2h_total_goals > 0:
-            expected_goals = (expected_goals + match.h2h_total_goals) / 2
-            if match.h2h_total_goals > line:
-                reasons.append(f"Srednio {match.h2h_total_goals:.1f} goli w H2H")
+        over_prob = self._over_probability(expected_goals, line)
+
+        if expected_goals > 2.5:
+            reasons.append(Reason("high_goals", (expected_goals,)))
+        if home.goals_per_game + away.goals_per_game > 3:
+            reasons.append(Reason("attacking_teams", (home.goals_per_game, away.goals_per_game)))
 
-        # Prawdopodobienstwo over (uproszczone Poisson)
+        return over_prob, reasons
+
+    @staticmethod
+    def _over_probability(expected_goals: float, line: float) -> float:
+        """Prawdopodobienstwo over (uproszczone Poisson)"""
         if expected_goals > line:
             over_prob = 0.5 + (expected_goals - line) * 0.15
         else:
             over_prob = 0.5 - (line - expected_goals) * 0.15
 
-        over_prob = min(0.85, max(0.15, over_prob))
+        return min(0.85, max(0.15, over_prob))
+
+
+class ScoreMatrix:
+    """
+    Laczny rozklad wyniku meczu P(gole gospodarzy = h, gole gosci = a)
+    z dwoch rozkladow Poissona, opcjonalnie z korekta Dixona-Colesa
+    dla niskich wynikow. Wszystkie rynki to odczyty z tej jednej macierzy.
+    """
+
+    MAX_GOALS = 10
+
+    def __init__(self, home_xg: float, away_xg: float, rho: float = 0.0,
+                 max_goals: int = MAX_GOALS):
+        """rho: parametr Dixona-Colesa (0 - czysty Poisson, typowo ok. -0.1)"""
+        self.home_xg = home_xg
+        self.away_xg = away_xg
+        self.rho = rho
+
+        home = self._poisson(home_xg, max_goals)
+        away = self._poisson(away_xg, max_goals)
+        probs = [[p_home * p_away for p_away in away] for p_home in home]
+        if rho:
+            # Korekta tau: 0-0 i 1-1 vs 1-0 i 0-1 (zalezne wyniki przy malej liczbie goli)
+            probs[0][0] *= max(0.0, 1 - home_xg * away_xg * rho)
+            probs[0][1] *= max(0.0, 1 + home_xg * rho)
+            probs[1][0] *= max(0.0, 1 + away_xg * rho)
+            probs[1][1] *= max(0.0, 1 - rho)
+
+        # Macierz obcieta do max_goals - normalizacja do sumy 1
+        total = sum(map(sum, probs))
+        self.probs = [[p / total for p in row] for row in probs]
+
+        # Sumy liczone raz - rynki to juz tylko odczyty
+        self.home_win = self.draw = self.away_win = 0.0
+        self.totals = [0.0] * (2 * max_goals + 1)
+        self.diffs = [0.0] * (2 * max_goals + 1)    # roznica goli h - a, od -max_goals
+        self.home_goals = [sum(row) for row in self.probs]
+        self.away_goals = [0.0] * (max_goals + 1)
+        for h, row in enumerate(self.probs):
+            for a, p in enumerate(row):
+                if h > a:
+                    self.home_win += p
+                elif h == a:
+                    self.draw += p
+                else:
+                    self.away_win += p
+                self.totals[h + a] += p
+                self.diffs[h - a + max_goals] += p
+                self.away_goals[a] += p
+        self.btts = 1 - sum(self.probs[0]) - sum(row[0] for row in self.probs) + self.probs[0][0]
+
+        # Dystrybuanty statystyk rynkow parametrycznych: (przesuniecie, P(x < k))
+        # - kazdy prog linii Market to dwa odczyty, niezaleznie od liczby linii
+        self._below = {
+            stat: (offset, list(itertools.accumulate(probs, initial=0.0)))
+            for stat, offset, probs in (
+                ("total", 0, self.totals),
+                ("diff", max_goals, self.diffs),
+                ("home", 0, self.home_goals),
+                ("away", 0, self.away_goals),
+            )
+        }
+        self._markets: Dict["Market", Tuple[float, float]] = {}
 
-        if expected_goals > 2.5:
-            reasons.append(f"Wysoka srednia goli: {expected_goals:.1f}")
-        if home.goals_per_game + away.goals_per_game > 3:
-            reasons.append(f"Ofensywne druzyny: {home.goals_per_game:.1f} + {away.goals_per_game:.1f} goli/mecz")
+    @staticmethod
+    def _poisson(mean: float, max_goals: int) -> List[float]:
+        probs = [math.exp(-mean)]
+        for k in range(1, max_goals + 1):
+            probs.append(probs[-1] * mean / k)
+        return probs
+
+    def over(self, line: float) -> float:
+        """P(suma goli > line), np. line=2.5"""
+        return sum(p for goals, p in enumerate(self.totals) if goals > line)
+
+    def under(self, line: float) -> float:
+        return 1 - self.over(line)
+
+    def market(self, market: "Market") -> Tuple[float, float]:
+        """(P(wygrana), P(zwrot)) rynku parametrycznego - polowki linii azjatyckiej po 1/2"""
+        price = self._markets.get(market)
+        if price is None:
+            price = self._markets[market] = self._market(market)
+        return price
+
+    def _market(self, market: "Market") -> Tuple[float, float]:
+        stat, sign, lines = market.spec()
+        offset, below = self._below[stat]
+        last = len(below) - 1
+        win = push = 0.0
+        for threshold in lines:
+            # P(x < t) i P(x == t) z dystrybuanty (t calkowite albo .5)
+            k = math.ceil(threshold) + offset
+            less = below[min(max(k, 0), last)]
+            equal = 0.0
+            if float(threshold).is_integer():
+                equal = below[min(max(k + 1, 0), last)] - less
+            win += (1 - less - equal) if sign > 0 else less
+            push += equal
+        return win / len(lines), push / len(lines)
+
+    def correct_score(self, home_goals: int, away_goals: int) -> float:
+        if home_goals >= len(self.probs) or away_goals >= len(self.probs):
+            return 0.0
+        return self.probs[home_goals][away_goals]
+
+    def most_likely_scores(self, count: int = 5) -> List[Tuple[Tuple[int, int], float]]:
+        scores = [((h, a), p) for h, row in enumerate(self.probs) for a, p in enumerate(row)]
+        return heapq.nlargest(count, scores, key=lambda score: score[1])
+
+
+@functools.lru_cache(maxsize=4096)
+def score_matrix(home_xg: float, away_xg: float, rho: float = 0.0) -> ScoreMatrix:
+    """ScoreMatrix z cache - mecze o tych samych oczekiwanych golach dziela macierz"""
+    return ScoreMatrix(home_xg, away_xg, rho)
+
+
+class PoissonModel(NamedTuple):
+    """Czesc analizy PoissonAnalyzer niezalezna od kursow"""
+    markets: List[Tuple[BetType, float, List[Reason]]]
+    matrix: ScoreMatrix
+    reasons: List[Reason]   # powody rynkow parametrycznych
+
+
+class PoissonAnalyzer(MatchAnalyzer):
+    """
+    Analizator oparty o macierz wynikow (ScoreMatrix): 1X2, BTTS i over/under
+    z jednego rozkladu. Powody typow jak w MatchAnalyzer + oczekiwane gole.
+    """
+
+    def __init__(self, rho: float = 0.0, features: Optional[FeatureExtractor] = None,
+                 ratings: Optional[EloRatings] = None):
+        """rho: korekta Dixona-Colesa (0 - wylaczona); ratings - tylko do powodow 1X2"""
+        super().__init__(features, ratings)
+        self.rho = rho
+
+    def expected_goals(self, match: Match, features: Optional[MatchFeatures] = None) -> Tuple[float, float]:
+        """Oczekiwane gole: atak druzyny usredniony z obrona rywala"""
+        features = features or self.features.match(match)
+        home = features.home
+        away = features.away
+        return (
+            (home.goals_per_game + away.conceded_per_game) / 2,
+            (away.goals_per_game + home.conceded_per_game) / 2,
+        )
 
-        return over_prob, reasons
+    def score_matrix(self, match: Match, features: Optional[MatchFeatures] = None) -> ScoreMatrix:
+        home_xg, away_xg = self.expected_goals(match, features)
+        # Zaokraglenie - wiecej trafien w cache, bez wplywu na typy
+        return score_matrix(round(home_xg, 3), round(away_xg, 3), self.rho)
+
+    def _build_model(self, match: Match) -> "PoissonModel":
+        """Rynki BetType z macierzy wynikow (typ, prawdopodobienstwo, powody) + sama macierz"""
+        features = self.features.match(match)
+        matrix = self.score_matrix(match, features)
+        _, _, reasons_1x2 = self._model_1x2(match, features)
+        _, btts_reasons = self._analyze_btts(match, features)
+        _, over_reasons = self._analyze_over_under(match, 2.5, features)
+        xg = Reason("expected_goals", (matrix.home_xg, matrix.away_xg))
+
+        markets = [
+            (BetType.HOME_WIN, matrix.home_win, reasons_1x2["home"]),
+            (BetType.DRAW, matrix.draw, reasons_1x2["draw"]),
+            (BetType.AWAY_WIN, matrix.away_win, reasons_1x2["away"]),
+            (BetType.HOME_OR_DRAW, matrix.home_win + matrix.draw,
+             reasons_1x2["home"] + [Reason("draw_cover")]),
+            (BetType.AWAY_OR_DRAW, matrix.away_win + matrix.draw,
+             reasons_1x2["away"] + [Reason("draw_cover")]),
+            (BetType.BTTS_YES, matrix.btts, btts_reasons),
+            (BetType.BTTS_NO, 1 - matrix.btts, [Reason("btts_no")]),
+            (BetType.OVER_25, matrix.over(2.5), over_reasons),
+            (BetType.UNDER_25, matrix.under(2.5), [Reason("under")]),
+            (BetType.OVER_35, matrix.over(3.5), [Reason("over_35")]),
+        ]
+        return PoissonModel(
+            [(bet_type, prob, [xg] + reasons) for bet_type, prob, reasons in markets],
+            matrix,
+            [xg],
+        )
+
+    def price(self, match: Match, model: "PoissonModel") -> Dict[BetType, Tuple[float, float, List[Reason]]]:
+        """
+        Jak w MatchAnalyzer: rynek z kursem w Match tylko gdy kurs jest, value wzgledem niego.
+        Rynki parametryczne (match.markets) - odczyty z tej samej macierzy, klucz to Market.
+        """
+        results = self._price_markets(match, model.markets)
+        for market, odds in match.markets.items():
+            if odds <= 0:
+                continue
+            win, push = model.matrix.market(market)
+            if push >= 1:
+                continue
+            # Pewnosc: linia calkowita - szansa wygranej, gdy zaklad sie rozstrzyga (push = zwrot);
+            # .25/.75 - sam win (pol wygranej liczone jako pol), bo push to tylko pol stawki
+            # przy przegranej drugiej polowie. Zwrot przy push: value = oczekiwany zysk / kurs
+            confidence = win / (1 - push) if float(market.line).is_integer() else win
+            results[market] = (confidence, (odds * win + push - 1) / odds, model.reasons)
+        return results
+
+    def analyze_batch(self, matches: Iterable[Match]) -> List[Dict[BetType, Tuple[float, float, List[Reason]]]]:
+        # Modele sa w cache - sciezka wektorowa MatchAnalyzer liczy inny model
+        return [self.analyze(match) for match in matches]
+
+
+class EloAnalyzer(MatchAnalyzer):
+    """
+    Model z samego rankingu Elo: 1X2 i podwojna szansa z oczekiwanego wyniku.
+    Innych rynkow nie wycenia - w zespole licza sie tam pozostale modele.
+    """
+
+    # Szansa remisu przy oczekiwanym wyniku 50% (maleje liniowo do 0 przy 0% / 100%)
+    DRAW_MAX = 0.30
+
+    def __init__(self, features: Optional[FeatureExtractor] = None,
+                 ratings: Optional[EloRatings] = None):
+        super().__init__(features, ratings or EloRatings())
+
+    def _build_model(self, match: Match) -> List[Tuple[BetType, float, List[Reason]]]:
+        """Rynki (typ, prawdopodobienstwo, powody); druzyny bez rankingu - INITIAL"""
+        league = match.league.league_name
+        home = self.ratings.get(league, match.home_team.name)
+        away = self.ratings.get(league, match.away_team.name)
+        expected = self.ratings.expected(home, away)
+
+        # expected = home + draw / 2
+        draw = self.DRAW_MAX * (1 - abs(2 * expected - 1))
+        home_prob = expected - draw / 2
+        away_prob = 1 - expected - draw / 2
+        reasons = [Reason("elo_expected", (home, away, expected))]
+        return [
+            (BetType.HOME_WIN, home_prob, reasons),
+            (BetType.DRAW, draw, reasons),
+            (BetType.AWAY_WIN, away_prob, reasons),
+            (BetType.HOME_OR_DRAW, home_prob + draw, reasons + [Reason("draw_cover")]),
+            (BetType.AWAY_OR_DRAW, away_prob + draw, reasons + [Reason("draw_cover")]),
+        ]
+
+    def price(self, match: Match, model: List[Tuple[BetType, float, List[Reason]]]) -> Dict:
+        return self._price_markets(match, model)
+
+    def analyze_batch(self, matches: Iterable[Match]) -> List[Dict[BetType, Tuple[float, float, List[Reason]]]]:
+        return [self.analyze(match) for match in matches]
+
+
+def _analyze_chunk(analyzer: MatchAnalyzer, matches: List[Match]) -> List[Dict]:
+    """
+    Zadanie procesu roboczego EnsembleAnalyzer: wyniki bez powodow (None) -
+    ich budowa i pickle kosztowalyby wiecej niz sama analiza
+    """
+    return [{key: (prob, value, None) for key, (prob, value, _) in analysis.items()}
+            for analysis in analyzer.analyze_batch(matches)]
+
+
+class EnsembleAnalyzer(MatchAnalyzer):
+    """
+    Zespol analizatorow z wagami. Prawdopodobienstwo i value rynku to srednia wazona
+    modeli, ktore go wyceniaja; powody z modelu o najwiekszej wadze.
+    analyze_batch liczy kazdy model na porcjach meczow rownolegle w puli procesow,
+    wiec wolny model nie wstrzymuje pozostalych. Analizator trafia do procesu razem
+    z zadaniem (bez cache) - zmiany rankingu Elo widac od nastepnego wywolania.
+    """
+
+    # Max meczow na zadanie puli i minimum, od ktorego pula sie oplaca (pickle meczow i wynikow)
+    CHUNK_SIZE = 2000
+    PARALLEL_MIN_SIZE = 256
+
+    def __init__(self, models: Iterable[Tuple[str, MatchAnalyzer, float]], workers: Optional[int] = None):
+        """
+        models: (nazwa, analizator, waga) - modele z waga 0 sa pomijane
+        workers: procesy puli (None - liczba CPU; 0 lub 1 - wszystko w biezacym procesie)
+        """
+        super().__init__()
+        models = [(name, analyzer, weight) for name, analyzer, weight in models if weight > 0]
+        if not models:
+            raise ValueError("Zespol bez modeli (wymagana waga > 0)")
+        # Wagi znormalizowane - jeden model daje dokladnie swoje wyniki
+        total = sum(weight for _, _, weight in models)
+        self.models = [(name, analyzer, weight / total) for name, analyzer, weight in models]
+        self.workers = os.cpu_count() if workers is None else workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_registry(cls, weights: Dict[str, float], ratings: Optional[EloRatings] = None,
+                      workers: Optional[int] = None) -> "EnsembleAnalyzer":
+        """Modele z ANALYZERS wg nazw, np. {"heuristic": 1.0, "poisson": 0.5}"""
+        unknown = [name for name in weights if name not in ANALYZERS]
+        if unknown:
+            raise ValueError(f"Nieznane modele: {', '.join(unknown)} (dostepne: {', '.join(ANALYZERS)})")
+        # Wspolny cache cech w procesie glownym
+        features = FeatureExtractor()
+        return cls([(name, ANALYZERS[name](features=features, ratings=ratings), weight)
+                    for name, weight in weights.items()], workers)
+
+    def model(self, match: Match) -> Tuple:
+        """Modele skladowe z ich cache; ta sama krotka dla tych samych modeli (rescore porownuje 'is')"""
+        parts = tuple(analyzer.model(match) for _, analyzer, _ in self.models)
+        return self._models.get(tuple(map(id, parts)), lambda: parts)
+
+    def _build_model(self, match: Match) -> Tuple:
+        return tuple(analyzer._build_model(match) for _, analyzer, _ in self.models)
+
+    def price(self, match: Match, model: Tuple) -> Dict:
+        return self._combine(match, [analyzer.price(match, part)
+                                     for (_, analyzer, _), part in zip(self.models, model)])
+
+    def analyze_batch(self, matches: Iterable[Match]) -> List[Dict]:
+        matches = list(matches)
+        if self.workers < 2 or len(matches) < self.PARALLEL_MIN_SIZE:
+            results = [analyzer.analyze_batch(matches) for _, analyzer, _ in self.models]
+        else:
+            # Co najmniej jedna porcja na proces; wszystkie zadania wszystkich modeli naraz
+            size = min(self.CHUNK_SIZE, -(-len(matches) // self.workers))
+            chunks = [matches[i:i + size] for i in range(0, len(matches), size)]
+            pool = self._executor()
+            futures = [[pool.submit(_analyze_chunk, analyzer, chunk) for chunk in chunks]
+                       for _, analyzer, _ in self.models]
+            results = [[analysis for future in model_futures for analysis in future.result()]
+                       for model_futures in futures]
+        return [self._combine(match, analyses) for match, analyses in zip(matches, zip(*results))]
+
+    def _combine(self, match: Match, analyses: List[Dict]) -> Dict:
+        """Srednia wazona po modelach, ktore wyceniaja rynek; powody z modelu o najwiekszej wadze"""
+        combined = {}
+        for index, ((_, _, weight), analysis) in enumerate(zip(self.models, analyses)):
+            for key, (prob, value, reasons) in analysis.items():
+                entry = combined.get(key)
+                if entry is None:
+                    combined[key] = [weight, prob * weight, value * weight, index, reasons]
+                    continue
+                entry[0] += weight
+                entry[1] += prob * weight
+                entry[2] += value * weight
+                if weight > self.models[entry[3]][2]:
+                    entry[3], entry[4] = index, reasons
+
+        results = {}
+        for key, (total, prob, value, index, reasons) in combined.items():
+            if reasons is None:
+                # Wynik z puli procesow - powody liczone tu, dopiero gdy ktos je czyta
+                reasons = LazyReasons(self._model_reasons, index, match, key)
+            results[key] = (prob / total, value / total, reasons)
+        return results
+
+    def _model_reasons(self, index: int, match: Match, key) -> List[Reason]:
+        analyzer = self.models[index][1]
+        return list(analyzer.price(match, analyzer.model(match))[key][2])
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        """Zamyka pule procesow"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for _, analyzer, _ in self.models:
+            analyzer.close()
+
+
+# Rejestr modeli (nazwa -> fabryka(features=, ratings=)) dla EnsembleAnalyzer i CONFIG["models"]
+ANALYZERS: Dict[str, Callable[..., MatchAnalyzer]] = {
+    "heuristic": MatchAnalyzer,
+    "poisson": functools.partial(PoissonAnalyzer, -0.1),
+    "elo": EloAnalyzer,
+}
 
 
 # ============================================
@@ -560,66 +3413,101 @@ class TipGenerator:
     def __init__(self, analyzer: MatchAnalyzer, config: Dict = None):
         self.analyzer = analyzer
         self.config = config or CONFIG
+        # rescore: match.id -> (model, kursy, kandydaci) z poprzedniego przeliczenia
+        self._scored: Dict[str, Tuple] = {}
 
     def generate_tips(self, matches: List[Match], max_tips: int = 3) -> List[BettingTip]:
         """Generuje najlepsze typy z listy meczow"""
-        all_tips = []
+        candidates = []
 
-        for match in matches:
-            analysis = self.analyzer.analyze(match)
+        # Wszystkie mecze jedna analiza wsadowa (wektorowo, gdy jest NumPy)
+        for match, analysis in zip(matches, self.analyzer.analyze_batch(matches)):
+            candidates.extend((match,) + candidate for candidate in self._filter(match, analysis))
 
-            for bet_type, (prob, value, reasons) in analysis.items():
-                # Filtruj wedlug kryteriow
-                if prob < self.config["min_confidence"]:
-                    continue
-                if value < self.config["min_value"]:
-                    continue
+        return self._select(candidates, max_tips)
 
-                odds = self._get_odds_for_bet(match, bet_type)
-                if not odds or odds < self.config["min_odds"] or odds > self.config["max_odds"]:
-                    continue
+    def rescore(self, matches: List[Match], max_tips: int = 3) -> List[BettingTip]:
+        """
+        generate_tips przy kazdej zmianie kursow. Model meczu (czesc niezalezna od kursow)
+        jest w cache analizatora; mecz jest wyceniany i filtrowany od nowa tylko gdy
+        zmienily sie jego kursy albo model - pozostali kandydaci z poprzedniego wywolania.
+        """
+        analyzer = self.analyzer
+        scored = {}
+        candidates = []
 
-                tip = BettingTip(
-                    match=match,
-                    bet_type=bet_type,
-                    odds=odds,
-                    confidence=prob,
-                    value=value,
-                    stake=self.config["unit_size"],
-                    reasoning=reasons
-                )
-                all_tips.append(tip)
+        for match in matches:
+            model = analyzer.model(match)
+            odds = (match.odds_home, match.odds_draw, match.odds_away,
+                    match.odds_btts_yes, match.odds_over_25, tuple(match.markets.items()))
+            entry = self._scored.get(match.id)
+            if entry is None or entry[0] is not model or entry[1] != odds:
+                entry = (model, odds, self._filter(match, analyzer.price(match, model)))
+            scored[match.id] = entry
+            candidates.extend((match,) + candidate for candidate in entry[2])
+
+        # Tylko mecze z biezacej listy
+        self._scored = scored
+        return self._select(candidates, max_tips)
+
+    def _filter(self, match: Match, analysis: Dict) -> List[Tuple]:
+        """Rynki meczu spelniajace kryteria: (bet_type, kurs, prob, value, powody)"""
+        candidates = []
+        for bet_type, (prob, value, reasons) in analysis.items():
+            # Filtruj wedlug kryteriow
+            if prob < self.config["min_confidence"]:
+                continue
+            if value < self.config["min_value"]:
+                continue
+
+            odds = self._get_odds_for_bet(match, bet_type)
+            if not odds or odds < self.config["min_odds"] or odds > self.config["max_odds"]:
+                continue
 
+            candidates.append((bet_type, odds, prob, value, reasons))
+        return candidates
+
+    def _select(self, candidates: List[Tuple], max_tips: int) -> List[BettingTip]:
+        """Najlepsze typy z kandydatow (match, bet_type, kurs, prob, value, powody)"""
         # Sortuj po value * confidence (expected value)
-        all_tips.sort(key=lambda t: t.value * t.confidence, reverse=True)
+        candidates.sort(key=lambda c: c[4] * c[3], reverse=True)
 
-        # Zwroc najlepsze typy (max 1 na mecz)
+        # Zwroc najlepsze typy (max 1 na mecz) - BettingTip i powody tylko dla wybranych
         selected = []
         seen_matches = set()
 
-        for tip in all_tips:
+        for match, bet_type, odds, prob, value, reasons in candidates:
             if len(selected) >= max_tips:
                 break
-            if tip.match.id in seen_matches:
+            if match.id in seen_matches:
                 continue
 
-            selected.append(tip)
-            seen_matches.add(tip.match.id)
+            selected.append(BettingTip(
+                match=match,
+                bet_type=bet_type,
+                odds=odds,
+                confidence=prob,
+                value=value,
+                stake=self.config["unit_size"],
+                reasoning=reasons
+            ))
+            seen_matches.add(match.id)
 
         return selected
 
-    def _get_odds_for_bet(self, match: Match, bet_type: BetType) -> Optional[float]:
-        """Pobiera kurs dla danego typu zakladu"""
-        odds_map = {
-            BetType.HOME_WIN: match.odds_home,
-            BetType.DRAW: match.odds_draw,
-            BetType.AWAY_WIN: match.odds_away,
-            BetType.BTTS_YES: match.odds_btts_yes,
-            BetType.OVER_25: match.odds_over_25,
-            BetType.HOME_OR_DRAW: self._calculate_double_chance_odds(match.odds_home, match.odds_draw),
-            BetType.AWAY_OR_DRAW: self._calculate_double_chance_odds(match.odds_away, match.odds_draw),
-        }
-        return odds_map.get(bet_type)
+    def _get_odds_for_bet(self, match: Match, bet_type) -> Optional[float]:
+        """Pobiera kurs dla danego typu zakladu (albo rynku parametrycznego)"""
+        if isinstance(bet_type, Market):
+            return match.markets.get(bet_type)
+        # Tylko potrzebny kurs - wywolywane dla kazdego kandydata przy kazdej zmianie kursow
+        field_name = ODDS_MARKETS.get(bet_type.code)
+        if field_name is not None:
+            return getattr(match, field_name)
+        if bet_type is BetType.HOME_OR_DRAW:
+            return self._calculate_double_chance_odds(match.odds_home, match.odds_draw)
+        if bet_type is BetType.AWAY_OR_DRAW:
+            return self._calculate_double_chance_odds(match.odds_away, match.odds_draw)
+        return None
 
     def _calculate_double_chance_odds(self, odds1: float, odds2: float) -> Optional[float]:
         """Oblicza kurs double chance na podstawie kursow skladowych"""
@@ -708,13 +3596,12 @@ class DataFetcher:
     }
 
     def __init__(self):
-        self.teams_cache: Dict[League, Dict[str, TeamStats]] = {}
+        self.teams = TeamTable()
         self._init_teams()
 
     def _init_teams(self):
-        """Inicjalizuje cache druzyn"""
+        """Wypelnia tabele druzyn"""
         for league, teams_data in self.TEAMS_DATA.items():
-            self.teams_cache[league] = {}
             for data in teams_data:
                 name, pos, played, wins, draws, losses, gf, ga = data
                 team = TeamStats(
@@ -729,7 +3616,7 @@ class DataFetcher:
                     points=wins * 3 + draws,
                     form=self._generate_form(wins, draws, losses),
                 )
-                self.teams_cache[league][name] = team
+                self.teams.add(league, team)
 
     def _generate_form(self, wins: int, draws: int, losses: int) -> List[str]:
         """Generuje forme na podstawie ogolnych statystyk"""
@@ -748,13 +3635,14 @@ class DataFetcher:
                 form.append('L')
         return form
 
-    def get_team(self, league: League, name: str) -> Optional[TeamStats]:
+    def get_team(self, league: League, name: str) -> Optional[TeamView]:
         """Pobiera statystyki druzyny"""
-        return self.teams_cache.get(league, {}).get(name)
+        row = self.teams.find(league, name)
+        return None if row is None else self.teams.view(row)
 
     def get_upcoming_matches(self, league: League, days: int = 7) -> List[Match]:
         """Pobiera nadchodzace mecze (symulacja)"""
-        teams = list(self.teams_cache.get(league, {}).values())
+        teams = [self.teams.view(row) for row in self.teams.rows(league)]
         if len(teams) < 2:
             return []
 
@@ -875,6 +3763,116 @@ class OutputFormatter:
 """
 
 
+# ============================================
+# RAPORTY
+# ============================================
+
+class Reporter:
+    """Statystyki i historia typow - bez pobierania danych i analizy"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    @classmethod
+    def open(cls, db_path: str = "betting_history.db", immutable: bool = False,
+             shard_by: Optional[str] = None) -> "Reporter":
+        """
+        Raport na polaczeniach tylko do odczytu - wiele procesow naraz obok
+        dzialajacego zapisu (WAL). immutable - tylko dla plikow, ktore sie nie zmieniaja.
+        Baze sprzed biezacego schematu najpierw raz migruje w trybie zapisu (poza immutable).
+        shard_by: None - CONFIG["db_shard_by"] (czytany przy wywolaniu)
+        """
+        shard_by = shard_by or CONFIG["db_shard_by"]
+        if not immutable and os.path.exists(db_path) and \
+                Database.schema_version(db_path) < Database.SCHEMA_VERSION:
+            print(f"  Migracja bazy {db_path} do biezacego schematu (jednorazowo)...")
+            Database(db_path, shard_by=shard_by).close()
+        return cls(Database(db_path, profile="fast", shard_by=shard_by,
+                            readonly=True, immutable=immutable))
+
+    def show_stats(self, days: int = 30, windows: Optional[Iterable[int]] = None):
+        """Wyswietla statystyki (windows - macierz okien x liga x typ zakladu)"""
+        if windows:
+            self._show_stats_matrix(windows)
+            return
+
+        stats = self.db.get_stats(days)
+
+        print(f"""
+############################################################
+  STATYSTYKI ({days} dni)
+############################################################
+  Liczba typow: {stats['total']}
+  Wygrane: {stats['wins']} ({stats['success_rate']:.1f}%)
+  Przegrane: {stats['losses']}
+
+  Stawki: {stats['total_stake']:.0f} PLN
+  Profit: {stats['total_profit']:+.2f} PLN
+  ROI: {stats['roi']:+.1f}%
+############################################################
+""")
+
+    def _show_stats_matrix(self, windows: Iterable[int]):
+        matrix = self.db.get_stats_matrix(windows)
+        windows = list(matrix)
+
+        def cell(stats: Optional[Dict]) -> str:
+            # liczba typow + ROI; "-" gdy brak rozliczonych typow w oknie
+            if not stats or not stats["total"]:
+                return f"{'-':>15}"
+            return f"{stats['total']:>6} {stats['roi']:+7.1f}%"
+
+        def line(label: str, pick: Callable[[Dict], Optional[Dict]]) -> str:
+            return f"  {label:<22}" + "".join(cell(pick(matrix[days])) for days in windows)
+
+        leagues = sorted({name for window in matrix.values() for name in window["leagues"]})
+        # Kody z macierzy: BetType w stalej kolejnosci, potem rynki parametryczne (Market)
+        present = {code for window in matrix.values() for code in window["bet_types"]}
+        codes = [bet_type.code for bet_type in BetType if bet_type.code in present]
+        codes += sorted(present.difference(codes))
+
+        print(f"\n{'#'*60}")
+        print(f"  STATYSTYKI ({'/'.join(map(str, windows))} dni) - typy / ROI")
+        print(f"{'#'*60}")
+        print(f"  {'':<22}" + "".join(f"{str(days) + ' dni':>15}" for days in windows))
+        print(line("RAZEM", lambda window: window["total"]))
+        for league in leagues:
+            print(line(league, lambda window: window["leagues"].get(league, {}).get("total")))
+            for code in codes:
+                if any(code in window["leagues"].get(league, {}).get("bet_types", {})
+                       for window in matrix.values()):
+                    print(line(f"  {code}", lambda window: window["leagues"].get(league, {})
+                               .get("bet_types", {}).get(code)))
+        print("  Typy zakladow")
+        for code in codes:
+            if any(code in window["bet_types"] for window in matrix.values()):
+                print(line(f"  {code}", lambda window: window["bet_types"].get(code)))
+        print(f"{'#'*60}\n")
+
+    def show_recent_tips(self, limit: Optional[int] = 10, filter: Optional[TipFilter] = None):
+        """Wyswietla ostatnie typy (limit=None - cala historia, strumieniowo)"""
+        print(f"\n{'='*60}")
+        print(f"  OSTATNIE {limit} TYPOW" if limit is not None else "  WSZYSTKIE TYPY")
+        print(f"{'='*60}\n")
+
+        page_size = min(limit, 500) if limit else 500
+        for count, tip in enumerate(self.db.iter_tips(filter, page_size=page_size), 1):
+            if limit is not None and count > limit:
+                break
+            result_str = tip.result or 'PENDING'
+            profit_str = f"{tip.profit:+.2f} PLN" if tip.profit is not None else "-"
+
+            print(f"  {tip.date} | {tip.league}")
+            print(f"  {tip.match}")
+            print(f"  {tip.bet_type} @ {tip.odds:.2f} | {result_str} | {profit_str}")
+            for reason in self.db.decode_reasoning(tip.reasoning):
+                print(f"    - {reason}")
+            print()
+
+    def close(self):
+        self.db.close()
+
+
 # ============================================
 # GLOWNA KLASA AGENTA
 # ============================================
@@ -882,12 +3880,28 @@ class OutputFormatter:
 class BettingAgent:
     """Glowny agent do generowania typow"""
 
-    def __init__(self, db_path: str = "betting_history.db"):
-        self.db = Database(db_path)
+    def __init__(self, db_path: str = "betting_history.db", db_profile="durable",
+                 write_behind: bool = False, db_shard_by: Optional[str] = None,
+                 analyzer: Optional[MatchAnalyzer] = None):
+        # None - CONFIG["db_shard_by"] z chwili tworzenia agenta (jak CONFIG["models"])
+        db_shard_by = db_shard_by or CONFIG["db_shard_by"]
+        self.db = Database(db_path, profile=db_profile, shard_by=db_shard_by)
+        # Opcjonalny zapis w tle - generowanie nie czeka na I/O bazy
+        self.writer = TipWriter(self.db) if write_behind else None
         self.fetcher = DataFetcher()
-        self.analyzer = MatchAnalyzer()
+        # Ranking Elo z bazy - druzyny bez rankingu analizowane wg pozycji w tabeli
+        self.ratings = EloRatings.load(self.db)
+        # Np. PoissonAnalyzer(rho=-0.1); domyslnie modele z CONFIG["models"] - kilka to zespol
+        if analyzer is None:
+            models = CONFIG["models"]
+            if len(models) == 1:
+                analyzer = ANALYZERS[next(iter(models))](ratings=self.ratings)
+            else:
+                analyzer = EnsembleAnalyzer.from_registry(models, self.ratings, CONFIG["model_workers"])
+        self.analyzer = analyzer
         self.generator = TipGenerator(self.analyzer)
         self.formatter = OutputFormatter()
+        self.reporter = Reporter(self.db)
 
     def run(self, leagues: List[League] = None) -> List[BettingTip]:
         """Uruchamia agenta i generuje typy"""
@@ -905,6 +3919,9 @@ class BettingAgent:
 
         print()
 
+        # Odczyt kursow do historii (ruchy linii)
+        self.db.record_odds(all_matches)
+
         # Generuj typy
         tips = self.generator.generate_tips(
             all_matches,
@@ -914,8 +3931,12 @@ class BettingAgent:
         # Wyswietl typy
         for i, tip in enumerate(tips, 1):
             print(self.formatter.format_tip(tip, i))
-            # Zapisz do bazy
-            self.db.save_tip(tip)
+            if self.writer:
+                self.writer.submit(tip)
+
+        # Zapisz do bazy (jedna transakcja)
+        if not self.writer:
+            self.db.save_tips(tips)
 
         # Podsumowanie
         stats = self.db.get_stats()
@@ -923,43 +3944,49 @@ class BettingAgent:
 
         return tips
 
-    def show_stats(self, days: int = 30):
-        """Wyswietla statystyki"""
-        stats = self.db.get_stats(days)
-
-        print(f"""
-############################################################
-  STATYSTYKI ({days} dni)
-############################################################
-  Liczba typow: {stats['total']}
-  Wygrane: {stats['wins']} ({stats['success_rate']:.1f}%)
-  Przegrane: {stats['losses']}
-
-  Stawki: {stats['total_stake']:.0f} PLN
-  Profit: {stats['total_profit']:+.2f} PLN
-  ROI: {stats['roi']:+.1f}%
-############################################################
-""")
-
-    def show_recent_tips(self, limit: int = 10):
-        """Wyswietla ostatnie typy"""
-        tips = self.db.get_recent_tips(limit)
-
-        print(f"\n{'='*60}")
-        print(f"  OSTATNIE {limit} TYPOW")
-        print(f"{'='*60}\n")
+    def record_results(self, results: Iterable[Tuple[Match, object]]) -> int:
+        """
+        Wyniki meczow (Match, wynik) - np. (mecz, '2:1'): rozlicza typy
+        i aktualizuje ranking Elo. Mecz juz wliczony do rankingu (np. powtorzony
+        import wynikow) jest pomijany. Returns: liczba rozliczonych typow
+        """
+        results = list(results)
+        settled = self.db.settle_many(results, skip_unknown=True)
+        rated = []
+        seen = set()
+        for (match, score), new in zip(results, self.db.unrated(match for match, _ in results)):
+            fixture = (match.league, match.home_team.name, match.away_team.name, match.kickoff.date())
+            if not new or fixture in seen:
+                continue
+            seen.add(fixture)
+            self.ratings.update(match.league.league_name, match.home_team.name,
+                                match.away_team.name, *parse_score(score))
+            rated.append(match)
+        self.ratings.save(self.db, rated=rated)
+        return settled
+
+    def replay_ratings(self, path: str) -> int:
+        """
+        Odbudowuje ranking Elo od zera z pliku CSV z wynikami i zapisuje w bazie.
+        Lista meczow wliczonych przez record_results zostaje (CSV to zwykle pelna historia)
+        """
+        self.ratings.ratings.clear()
+        self.ratings.games.clear()
+        count = self.ratings.replay(EloRatings.read_csv(path))
+        self.ratings.save(self.db, replace_all=True)
+        return count
 
-        for tip in tips:
-            result_str = tip['result'] or 'PENDING'
-            profit_str = f"{tip['profit']:+.2f} PLN" if tip['profit'] is not None else "-"
+    def show_stats(self, days: int = 30, windows: Optional[Iterable[int]] = None):
+        self.reporter.show_stats(days, windows)
 
-            print(f"  {tip['date']} | {tip['league']}")
-            print(f"  {tip['match']}")
-            print(f"  {tip['bet_type']} @ {tip['odds']:.2f} | {result_str} | {profit_str}")
-            print()
+    def show_recent_tips(self, limit: Optional[int] = 10, filter: Optional[TipFilter] = None):
+        self.reporter.show_recent_tips(limit, filter)
 
     def close(self):
-        """Zamyka polaczenia"""
+        """Zamyka polaczenia (najpierw zapisuje kolejke write-behind)"""
+        if self.writer:
+            self.writer.close()
+        self.analyzer.close()
         self.db.close()
 
 
@@ -969,23 +3996,39 @@ class BettingAgent:
 
 def main():
     """Glowna funkcja CLI"""
-    import sys
+    command = sys.argv[1].lower() if len(sys.argv) > 1 else None
 
-    agent = BettingAgent()
-
-    try:
-        if len(sys.argv) > 1:
-            command = sys.argv[1].lower()
+    # Raporty: baza tylko do odczytu, bez pobierania danych i analizatora
+    if command in ("stats", "history"):
+        try:
+            reporter = Reporter.open()
+        except (FileNotFoundError, ValueError) as e:
+            print(e)
+            return
 
+        try:
             if command == "stats":
-                days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
-                agent.show_stats(days)
+                args = sys.argv[2:]
+                if args and args[0].lower() == "matrix":
+                    windows = [int(arg) for arg in args[1:]] or [7, 30, 90, 365]
+                    reporter.show_stats(windows=windows)
+                elif len(args) > 1:
+                    reporter.show_stats(windows=[int(arg) for arg in args])
+                else:
+                    reporter.show_stats(int(args[0]) if args else 30)
+
+            else:
+                arg = sys.argv[2].lower() if len(sys.argv) > 2 else "10"
+                reporter.show_recent_tips(None if arg == "all" else int(arg))
+        finally:
+            reporter.close()
+        return
 
-            elif command == "history":
-                limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
-                agent.show_recent_tips(limit)
+    agent = BettingAgent()
 
-            elif command == "tips":
+    try:
+        if command is not None:
+            if command == "tips":
                 # Filtruj po ligach
                 leagues = []
                 for arg in sys.argv[2:]:
@@ -999,6 +4042,26 @@ def main():
 
                 agent.run(leagues if leagues else None)
 
+            elif command == "rebuild-stats":
+                agent.db.rebuild_daily_stats()
+                print("Przeliczono tabele daily_stats")
+
+            elif command == "compact-odds":
+                days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+                removed = agent.db.compact_odds(older_than_days=days)
+                print(f"Usunieto {removed} starych odczytow kursow")
+
+            elif command == "archive":
+                # Np. "archive 2025-01" (miesiac) albo "archive 2024-25" (sezon)
+                agent.db.archive_shard(sys.argv[2])
+                print(f"Zarchiwizowano shard {sys.argv[2]}")
+
+            elif command == "ratings":
+                # Np. "ratings wyniki.csv" - odtworzenie rankingu Elo z historii wynikow
+                start = time.perf_counter()
+                count = agent.replay_ratings(sys.argv[2])
+                print(f"Ranking Elo z {count} wynikow ({time.perf_counter() - start:.1f} s)")
+
             elif command == "help":
                 print("""
 Betting Tips Agent - Uzycie:
@@ -1007,7 +4070,14 @@ Betting Tips Agent - Uzycie:
   python betting_tips_agent.py tips epl - Generuj typy (tylko Premier League)
   python betting_tips_agent.py stats    - Pokaz statystyki (30 dni)
   python betting_tips_agent.py stats 7  - Pokaz statystyki (7 dni)
+  python betting_tips_agent.py stats matrix - Statystyki 7/30/90/365 dni x liga x typ
+  python betting_tips_agent.py stats 7 30 - Macierz dla wybranych okien
   python betting_tips_agent.py history  - Pokaz ostatnie typy
+  python betting_tips_agent.py history all - Pokaz cala historie
+  python betting_tips_agent.py rebuild-stats - Przelicz statystyki dzienne
+  python betting_tips_agent.py compact-odds 7 - Rzedsza historia kursow starszych niz 7 dni
+  python betting_tips_agent.py archive 2025-01 - Zarchiwizuj shard (tylko odczyt)
+  python betting_tips_agent.py ratings wyniki.csv - Odbuduj ranking Elo z wynikow (CSV)
   python betting_tips_agent.py help     - Pokaz pomoc
                 """)
 
@@ -0,0 +1,26 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from betting_tips_agent import BetType, BettingTip, League, Match, TeamStats  # noqa: E402
+
+
+def make_match(home: str = "Arsenal", away: str = "Chelsea", kickoff: datetime = None,
+               league: League = League.PREMIER_LEAGUE) -> Match:
+    return Match(id=f"{home}-{away}", league=league, home_team=TeamStats(home), away_team=TeamStats(away),
+                 kickoff=kickoff or datetime.now())
+
+
+def make_tip(match: Match, bet_type=BetType.HOME_WIN, odds: float = 2.0, stake: float = 10.0,
+             timestamp: datetime = None) -> BettingTip:
+    return BettingTip(match=match, bet_type=bet_type, odds=odds, confidence=0.7, value=0.1,
+                      stake=stake, reasoning=["Test"], timestamp=timestamp or match.kickoff)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "betting_history.db")
@@ -0,0 +1,65 @@
+"""analyze_batch (wektorowo z numpy albo skalarnie) daje dokladnie to samo co analyze."""
+
+import os
+import random
+import sys
+
+import pytest
+
+import betting_tips_agent
+from betting_tips_agent import ANALYZERS, EloRatings, EnsembleAnalyzer, Market
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from bench_analyze_batch import generate_matches, generate_teams  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def matches():
+    rng = random.Random(7)
+    teams = generate_teams(rng)
+    matches = list(generate_matches(rng, teams, 400))
+    for match in matches[::3]:
+        match.markets = {Market("over", 2.75): 1.9, Market("ah_home", -0.25): 1.95,
+                         Market("away_under", 1.5): 1.7}
+    return matches
+
+
+@pytest.fixture(scope="module")
+def ratings(matches):
+    rng = random.Random(8)
+    ratings = EloRatings()
+    # Ranking tylko dla czesci druzyn - reszta meczow idzie sciezka pozycji w tabeli
+    for match in matches[:150]:
+        for team in (match.home_team, match.away_team):
+            ratings.ratings[(match.league.league_name, team.name)] = rng.uniform(1300, 1700)
+            ratings.games[(match.league.league_name, team.name)] = 10
+    return ratings
+
+
+@pytest.mark.parametrize("name", list(ANALYZERS))
+@pytest.mark.parametrize("with_ratings", [False, True])
+def test_analyze_batch_matches_analyze(matches, ratings, name, with_ratings):
+    analyzer = ANALYZERS[name](ratings=ratings if with_ratings else None)
+    expected = [analyzer.analyze(match) for match in matches]
+    assert analyzer.analyze_batch(matches) == expected
+    # Mala partia (ponizej BATCH_MIN_SIZE) i dane w innej kolejnosci
+    assert analyzer.analyze_batch(matches[:5]) == expected[:5]
+    assert analyzer.analyze_batch(matches[::-1]) == expected[::-1]
+
+
+def test_analyze_batch_without_numpy(matches, monkeypatch):
+    analyzer = ANALYZERS["heuristic"]()
+    expected = analyzer.analyze_batch(matches)
+    monkeypatch.setattr(betting_tips_agent, "np", None)
+    assert analyzer.analyze_batch(matches) == expected
+
+
+def test_ensemble_analyze_batch_matches_analyze(matches, ratings):
+    ensemble = EnsembleAnalyzer.from_registry({"heuristic": 1.0, "poisson": 0.7, "elo": 0.5},
+                                              ratings, workers=0)
+    try:
+        assert ensemble.analyze_batch(matches) == [ensemble.analyze(match) for match in matches]
+    finally:
+        ensemble.close()
+
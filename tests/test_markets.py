@@ -0,0 +1,61 @@
+"""
+Rynki z ScoreMatrix = suma prawdopodobienstw wynikow rozliczonych przez settle_bet
+(ta sama specyfikacja rynku sluzy do wyceny i rozliczenia).
+"""
+
+import pytest
+
+from betting_tips_agent import BetType, Market, ScoreMatrix, settle_bet
+
+# Udzial wyniku rozliczenia w (wygrana, zwrot) - polowki linii azjatyckiej po 1/2
+SHARES = {
+    "WIN": (1.0, 0.0),
+    "HALF_WIN": (0.5, 0.5),
+    "VOID": (0.0, 1.0),
+    "HALF_LOSS": (0.0, 0.5),
+    "LOSS": (0.0, 0.0),
+}
+
+LINES = [line / 4 for line in range(-16, 17)]
+MARKETS = [
+    Market(kind, line)
+    for kind in Market.KINDS
+    for line in LINES
+    if kind.startswith("ah") or line > 0
+]
+
+MATRICES = [(1.4, 1.1, 0.0), (2.3, 0.6, -0.1), (0.4, 0.5, -0.15), (3.0, 2.8, 0.05)]
+
+
+def brute_force(matrix: ScoreMatrix, code: str):
+    win = push = 0.0
+    for h, row in enumerate(matrix.probs):
+        for a, p in enumerate(row):
+            win_share, push_share = SHARES[settle_bet(code, h, a)]
+            win += p * win_share
+            push += p * push_share
+    return win, push
+
+
+@pytest.mark.parametrize("xg", MATRICES)
+def test_market_matches_settlement(xg):
+    matrix = ScoreMatrix(*xg)
+    for market in MARKETS:
+        assert Market.parse(market.code) == market
+        assert matrix.market(market) == pytest.approx(brute_force(matrix, market.code), abs=1e-12), market
+
+
+@pytest.mark.parametrize("xg", MATRICES)
+def test_bet_types_match_settlement(xg):
+    matrix = ScoreMatrix(*xg)
+    expected = {
+        BetType.HOME_WIN: matrix.home_win,
+        BetType.DRAW: matrix.draw,
+        BetType.AWAY_WIN: matrix.away_win,
+        BetType.BTTS_YES: matrix.btts,
+        BetType.OVER_25: matrix.over(2.5),
+        BetType.OVER_35: matrix.over(3.5),
+        BetType.UNDER_25: matrix.under(2.5),
+    }
+    for bet_type, probability in expected.items():
+        assert brute_force(matrix, bet_type.code) == pytest.approx((probability, 0.0), abs=1e-12)
@@ -0,0 +1,156 @@
+"""
+Migracje historii typow: baza w schemacie oryginalnego skryptu (liga i mecz
+jako tekst w tips) otwierana przez Database - bez i z shardami.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from betting_tips_agent import Database  # noqa: E402
+
+# Schemat z pierwszej wersji skryptu (przed normalizacja i rollupami)
+BASELINE_SCHEMA = '''
+    CREATE TABLE tips (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        league TEXT NOT NULL,
+        match TEXT NOT NULL,
+        bet_type TEXT NOT NULL,
+        odds REAL NOT NULL,
+        stake REAL NOT NULL,
+        confidence REAL NOT NULL,
+        value REAL NOT NULL,
+        reasoning TEXT,
+        result TEXT,
+        profit REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE daily_stats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT UNIQUE NOT NULL,
+        tips_count INTEGER DEFAULT 0,
+        wins INTEGER DEFAULT 0,
+        losses INTEGER DEFAULT 0,
+        total_stake REAL DEFAULT 0,
+        total_return REAL DEFAULT 0,
+        profit REAL DEFAULT 0,
+        roi REAL DEFAULT 0
+    );
+'''
+
+
+def day(offset: int) -> str:
+    return (datetime.now() - timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+# (id, dni temu, liga, mecz, typ, kurs, wynik, zysk) - luki w id jak po usunietych wierszach;
+# ta sama para druzyn w dwoch terminach i ta sama nazwa druzyny w dwoch ligach
+ROWS = [
+    (1, 80, "Premier League", "Arsenal vs Chelsea", "1", 2.10, "WIN", 11.0),
+    (2, 80, "Premier League", "Liverpool vs Everton", "O2.5", 1.80, "LOSS", -10.0),
+    (5, 45, "Serie A", "Inter vs Milan", "BTTS", 1.70, "WIN", 7.0),
+    (6, 45, "Bundesliga", "Bayern Munich vs Dortmund", "X", 3.40, None, None),
+    (7, 20, "Premier League", "Arsenal vs Chelsea", "1X", 1.45, "LOSS", -10.0),
+    (9, 3, "Serie A", "Inter vs Milan", "2", 3.10, "WIN", 21.0),
+    (12, 3, "Bundesliga", "Arsenal vs Chelsea", "U2.5", 2.00, None, None),
+]
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = str(tmp_path / "betting_history.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    for tip_id, offset, league, match, bet_type, odds, result, profit in ROWS:
+        conn.execute('''
+            INSERT INTO tips (id, date, league, match, bet_type, odds, stake, confidence,
+                              value, reasoning, result, profit, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, 10, 0.7, 0.1, ?, ?, ?, ?)
+        ''', (tip_id, day(offset), league, match, bet_type, odds,
+              json.dumps([f"Powod {tip_id}"]), result, profit, f"{day(offset)} 12:00:{tip_id:02d}"))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def expected_daily_stats():
+    """Rollup liczony wprost z ROWS: data -> (typy, wygrane, przegrane, rozliczone, stawka, zysk)"""
+    days = {}
+    for _, offset, _, _, _, _, result, profit in ROWS:
+        count, wins, losses, settled, stake, total = days.get(day(offset), (0, 0, 0, 0, 0.0, 0.0))
+        days[day(offset)] = (count + 1, wins + (result == "WIN"), losses + (result == "LOSS"),
+                             settled + (result is not None), stake + 10, total + (profit or 0))
+    return days
+
+
+def daily_stats(db: Database) -> dict:
+    rows = []
+    for key in db._partitions():
+        rows += db._query(key, '''
+            SELECT date, tips_count, wins, losses, settled, total_stake, profit FROM {daily_stats}
+            WHERE tips_count > 0
+        ''')
+    return {date: tuple(values) for date, *values in rows}
+
+
+def check_history(db: Database):
+    tips = {tip.id: tip for tip in db.iter_tips()}
+    assert sorted(tips) == [row[0] for row in ROWS]
+    for tip_id, offset, league, match, bet_type, odds, result, profit in ROWS:
+        tip = tips[tip_id]
+        assert (tip.date, tip.league, tip.match, tip.bet_type) == (day(offset), league, match, bet_type)
+        assert (tip.odds, tip.result, tip.profit) == (odds, result, profit)
+        assert db.decode_reasoning(tip.reasoning) == [f"Powod {tip_id}"]
+
+    assert daily_stats(db) == expected_daily_stats()
+
+    stats = db.get_stats(days=365)
+    assert (stats["total"], stats["wins"], stats["losses"]) == (5, 3, 2)
+    assert stats["total_profit"] == pytest.approx(19.0)
+    stats = db.get_stats(days=30)
+    assert (stats["total"], stats["wins"], stats["losses"]) == (2, 1, 1)
+    assert db.get_stats(days=365, league="Serie A")["total_profit"] == pytest.approx(28.0)
+
+
+def test_migrate_baseline_schema(baseline_db):
+    db = Database(baseline_db)
+    try:
+        check_history(db)
+        columns = {row[1] for row in db._fetchall("PRAGMA table_info(tips)")}
+        assert "league" not in columns and "match" not in columns
+        assert db._fetchone("PRAGMA user_version")[0] == Database.SCHEMA_VERSION
+        # Ta sama para w innym terminie albo w innej lidze - osobny mecz
+        assert db._fetchone("SELECT COUNT(*) FROM matches")[0] == len(ROWS)
+    finally:
+        db.close()
+
+    # Ponowne otwarcie niczego nie zmienia; nowe id po najwyzszym starym
+    db = Database(baseline_db)
+    try:
+        check_history(db)
+        assert db._fetchone("SELECT seq FROM sqlite_sequence WHERE name = 'tips'")[0] == 12
+    finally:
+        db.close()
+
+
+def test_migrate_baseline_schema_into_shards(baseline_db):
+    db = Database(baseline_db, shard_by="month")
+    try:
+        check_history(db)
+        assert db._fetchone("SELECT COUNT(*) FROM main.tips")[0] == 0
+        assert db.shard_keys() == sorted({db.shards.key(day(row[1])) for row in ROWS})
+    finally:
+        db.close()
+
+    db = Database(baseline_db, shard_by="month", readonly=True)
+    try:
+        check_history(db)
+    finally:
+        db.close()
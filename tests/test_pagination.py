@@ -0,0 +1,49 @@
+"""
+iter_tips: paginacja keyset po (created_at, id) - typy z tym samym created_at
+(jedna partia zapisu) nie gina ani nie powtarzaja sie na granicy stron.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from betting_tips_agent import Database, TipFilter
+from conftest import make_match, make_tip
+
+
+def set_created_at(db: Database, created_at: str, modulo: int):
+    """Ten sam created_at dla co `modulo`-tego typu (remisy niezalezne od zegara)"""
+    for key in db._partitions():
+        with db.connection() as conn:
+            schema = db._attach(conn, key)
+            with db.transaction() as conn:
+                conn.execute(f"UPDATE {schema}.tips SET created_at = ? WHERE id % ? = 0",
+                             (created_at, modulo))
+
+
+@pytest.mark.parametrize("shard_by", [None, "month"])
+def test_iter_tips_pages_through_created_at_ties(db_path, shard_by):
+    db = Database(db_path, shard_by=shard_by)
+    try:
+        now = datetime.now()
+        ids = db.save_tips(make_tip(make_match(f"Home {i}", "Away", now - timedelta(days=9 * i)))
+                           for i in range(23))
+        set_created_at(db, "2026-01-01 12:00:00", 2)
+
+        rows = list(db.iter_tips(page_size=4))
+        assert sorted(row.id for row in rows) == sorted(ids)
+        assert len({row.created_at for row in rows}) < len(rows)
+        cursors = [row.cursor for row in rows]
+        assert cursors == sorted(cursors, reverse=True)
+
+        for page_size in (1, 3, 4, 50):
+            assert list(db.iter_tips(page_size=page_size)) == rows
+        # Wznowienie od kursora w srodku grupy remisow i na jej granicy
+        for cut in range(1, len(rows)):
+            assert list(db.iter_tips(after_cursor=rows[cut - 1].cursor, page_size=3)) == rows[cut:]
+
+        since = (now - timedelta(days=60)).strftime("%Y-%m-%d")
+        recent = list(db.iter_tips(TipFilter(since=since), page_size=2))
+        assert recent == [row for row in rows if row.date >= since]
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+"""
+record_results: kazdy wynik meczu trafia do rankingu Elo tylko raz - takze
+przy powtorzonym imporcie, duplikatach w jednej partii i po ponownym otwarciu bazy.
+"""
+
+from datetime import datetime, timedelta
+
+from betting_tips_agent import BettingAgent, League, MatchAnalyzer
+from conftest import make_match, make_tip
+
+
+def snapshot(agent: BettingAgent) -> dict:
+    return {(league, team): (rating, games) for league, team, rating, games in agent.ratings.rows()}
+
+
+def open_agent(db_path: str) -> BettingAgent:
+    return BettingAgent(db_path, analyzer=MatchAnalyzer())
+
+
+def test_record_results_is_idempotent(db_path):
+    kickoff = datetime.now() - timedelta(days=1)
+    tipped = make_match("Arsenal", "Chelsea", kickoff)
+    # Mecz bez typow i ta sama para w innej lidze
+    untipped = make_match("Inter", "Milan", kickoff, League.SERIE_A)
+    other_league = make_match("Arsenal", "Chelsea", kickoff, League.BUNDESLIGA)
+    results = [(tipped, "2:1"), (untipped, (0, 0)), (tipped, "2:1"), (other_league, "0:3")]
+
+    agent = open_agent(db_path)
+    try:
+        agent.db.save_tip(make_tip(tipped))
+        assert agent.record_results(results) == 1
+        rated = snapshot(agent)
+        assert rated[("Premier League", "Arsenal")][1] == 1
+        assert rated[("Bundesliga", "Chelsea")][1] == 1
+        assert len(rated) == 6
+
+        # Powtorzony import - te same wyniki jako nowe obiekty Match
+        again = [(make_match(match.home_team.name, match.away_team.name, kickoff, match.league), score)
+                 for match, score in results]
+        assert agent.record_results(again) == 0
+        assert snapshot(agent) == rated
+    finally:
+        agent.close()
+
+    agent = open_agent(db_path)
+    try:
+        assert snapshot(agent) == rated
+        assert agent.record_results(results) == 0
+        assert snapshot(agent) == rated
+
+        # Rewanz (inna data) to nowy mecz
+        rematch = make_match("Arsenal", "Chelsea", kickoff + timedelta(days=7))
+        agent.record_results([(rematch, "0:0")])
+        assert snapshot(agent)[("Premier League", "Arsenal")][1] == 2
+    finally:
+        agent.close()
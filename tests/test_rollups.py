@@ -0,0 +1,93 @@
+"""
+Rollup daily_stats utrzymywany przez triggery = przeliczenie z surowych typow
+po wstawieniach, rozliczeniach, zmianach wynikow i usunieciach.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from betting_tips_agent import RESULTS, BetType, Database
+from conftest import make_match, make_tip
+
+WINS = ("WIN", "HALF_WIN")
+LOSSES = ("LOSS", "HALF_LOSS")
+
+
+def recomputed(db: Database) -> dict:
+    """data -> (typy, wygrane, przegrane, rozliczone, stawka, stawka rozliczonych, zwrot, zysk)"""
+    days = {}
+    for tip in db.iter_tips():
+        settled = tip.result is not None
+        profit = tip.profit or 0.0
+        row = days.get(tip.date, (0, 0, 0, 0, 0.0, 0.0, 0.0, 0.0))
+        days[tip.date] = tuple(total + value for total, value in zip(row, (
+            1, tip.result in WINS, tip.result in LOSSES, settled, tip.stake,
+            tip.stake if settled else 0.0, tip.stake + profit if settled else 0.0, profit,
+        )))
+    return days
+
+
+def rollup(db: Database) -> dict:
+    rows = []
+    for key in db._partitions():
+        rows += db._query(key, '''
+            SELECT date, tips_count, wins, losses, settled, total_stake, settled_stake,
+                   total_return, profit, roi
+            FROM {daily_stats} WHERE tips_count > 0
+        ''')
+    days = {}
+    for date, *values, profit, roi in rows:
+        settled_stake = values[5]
+        assert roi == pytest.approx(profit * 100 / settled_stake if settled_stake else 0)
+        days[date] = (*values, profit)
+    return days
+
+
+def check_rollup(db: Database):
+    actual, expected = rollup(db), recomputed(db)
+    assert sorted(actual) == sorted(expected)
+    for date, values in expected.items():
+        assert actual[date] == pytest.approx(values), date
+
+
+def delete_tips(db: Database, modulo: int):
+    for key in db._partitions():
+        with db.connection() as conn:
+            schema = db._attach(conn, key)
+            with db.transaction() as conn:
+                conn.execute(f"DELETE FROM {schema}.tips WHERE id % ? = 0", (modulo,))
+
+
+@pytest.mark.parametrize("shard_by", [None, "month"])
+def test_rollup_matches_raw_tips(db_path, shard_by):
+    rng = random.Random(4)
+    db = Database(db_path, shard_by=shard_by)
+    try:
+        now = datetime.now()
+        tips = []
+        for i in range(200):
+            kickoff = now - timedelta(days=rng.randrange(90))
+            tips.append(make_tip(make_match(f"Home {i % 7}", f"Away {i % 5}", kickoff),
+                                 rng.choice(list(BetType)), round(rng.uniform(1.4, 3.5), 2),
+                                 stake=rng.choice([5.0, 10.0, 20.0])))
+        ids = db.save_tips(tips)
+        check_rollup(db)
+
+        db.settle_many((tip_id, rng.choice(RESULTS)) for tip_id in ids[:150])
+        check_rollup(db)
+
+        # Zmiana wyniku (poprawka) i jawny zysk
+        for tip_id in ids[:40]:
+            db.update_result(tip_id, rng.choice(RESULTS))
+        db.update_result(ids[40], "WIN", profit=3.5)
+        check_rollup(db)
+
+        delete_tips(db, 3)
+        check_rollup(db)
+
+        db.rebuild_daily_stats()
+        check_rollup(db)
+    finally:
+        db.close()
@@ -0,0 +1,79 @@
+"""
+Rozliczanie typow (settle_many): zysk liczony z zapisanych kursow i stawek,
+takze dla polowek linii azjatyckich; bledne rekordy - ValueError przed zapisem.
+"""
+
+import pytest
+
+from betting_tips_agent import BetType, Database, Market
+from conftest import make_match, make_tip
+
+# (typ, kurs, wynik przy 2:1, zysk przy stawce 10)
+BETS = [
+    (BetType.HOME_WIN, 2.0, "WIN", 10.0),
+    (BetType.DRAW, 3.4, "LOSS", -10.0),
+    (Market("over", 2.75), 1.9, "HALF_WIN", 4.5),
+    (Market("ah_home", -1.25), 2.2, "HALF_LOSS", -5.0),
+    (Market("under", 3.0), 2.0, "VOID", 0.0),
+]
+
+
+@pytest.fixture
+def db(db_path):
+    db = Database(db_path)
+    yield db
+    db.close()
+
+
+def settled(db: Database) -> dict:
+    return {tip.id: (tip.result, tip.profit) for tip in db.iter_tips()}
+
+
+def test_settle_by_match_derives_profit(db):
+    match = make_match()
+    ids = db.save_tips(make_tip(match, bet_type, odds) for bet_type, odds, _, _ in BETS)
+
+    assert db.settle_many([(match, "2:1")]) == len(BETS)
+    tips = settled(db)
+    for tip_id, (_, _, result, profit) in zip(ids, BETS):
+        assert tips[tip_id][0] == result
+        assert tips[tip_id][1] == pytest.approx(profit)
+
+    stats = db.get_stats(days=30)
+    assert (stats["wins"], stats["losses"]) == (2, 2)
+    assert stats["total_profit"] == pytest.approx(sum(profit for *_, profit in BETS))
+
+    # Powtorzony wynik niczego juz nie rozlicza
+    assert db.settle_many([("Arsenal vs Chelsea", (2, 1))]) == 0
+
+
+def test_settle_by_id_derives_profit(db):
+    ids = db.save_tips(make_tip(make_match(), odds=odds) for _, odds, _, _ in BETS)
+
+    db.settle_many((tip_id, result) for tip_id, (_, _, result, _) in zip(ids, BETS))
+    tips = settled(db)
+    for tip_id, (_, odds, result, _) in zip(ids, BETS):
+        expected = {"WIN": 10 * (odds - 1), "HALF_WIN": 5 * (odds - 1), "VOID": 0.0,
+                    "HALF_LOSS": -5.0, "LOSS": -10.0}[result]
+        assert tips[tip_id] == (result, pytest.approx(expected))
+
+
+def test_settle_rejects_unknown_result(db):
+    first, second = db.save_tips([make_tip(make_match()), make_tip(make_match("Inter", "Milan"))])
+
+    with pytest.raises(ValueError, match="'win'"):
+        db.settle_many([(first, "WIN"), (second, "win")])
+    assert settled(db) == {first: (None, None), second: (None, None)}
+
+
+def test_settle_rejects_unknown_match(db):
+    match = make_match()
+    tip_id = db.save_tip(make_tip(match))
+
+    with pytest.raises(ValueError, match="Liverpool vs Everton"):
+        db.settle_many([(match, "1:0"), ("Liverpool vs Everton", "1:0")])
+    assert settled(db) == {tip_id: (None, None)}
+
+    assert db.settle_many([(match, "1:0"), (make_match("Liverpool", "Everton"), "1:0")],
+                          skip_unknown=True) == 1
+    assert settled(db)[tip_id] == ("WIN", pytest.approx(10.0))
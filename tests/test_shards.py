@@ -0,0 +1,92 @@
+"""
+Shardy historii: wiecej plikow niz MAX_ATTACHED (LRU podlaczen) i zarchiwizowane
+shardy - czytane, ale kazdy zapis do nich to ValueError.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from betting_tips_agent import Database
+from conftest import make_match, make_tip
+
+
+def months_back(count: int) -> list:
+    now = datetime.now()
+    return [now - timedelta(days=31 * i) for i in range(count)]
+
+
+def test_more_shards_than_attached(db_path):
+    db = Database(db_path, shard_by="month")
+    try:
+        matches = [make_match(f"Home {i}", "Away", kickoff)
+                   for i, kickoff in enumerate(months_back(Database.MAX_ATTACHED + 4))]
+        ids = db.save_tips(make_tip(match) for match in matches)
+        assert len(db.shard_keys()) == len(matches)
+        assert all(len(attached) <= Database.MAX_ATTACHED for attached in db._attached.values())
+
+        assert db.settle_many((match, "2:0") for match in matches) == len(matches)
+        stats = db.get_stats(days=400)
+        assert (stats["total"], stats["wins"]) == (len(matches), len(matches))
+        assert stats["total_profit"] == pytest.approx(10.0 * len(matches))
+        assert sorted(row.id for row in db.iter_tips()) == sorted(ids)
+        assert len(db.get_team_stats(days=400)) == len(matches) + 1
+
+        db.update_result(ids[-1], "LOSS")
+        assert db.get_stats(days=400)["losses"] == 1
+        assert all(len(attached) <= Database.MAX_ATTACHED for attached in db._attached.values())
+    finally:
+        db.close()
+
+
+def test_archived_shard_rejects_writes(db_path):
+    db = Database(db_path, shard_by="month")
+    try:
+        old, current = make_match("Inter", "Milan", months_back(3)[-1]), make_match()
+        old_id, current_id = db.save_tips([make_tip(old), make_tip(current)])
+        key = db.shards.key(old.kickoff.strftime("%Y-%m-%d"))
+
+        with pytest.raises(ValueError):
+            db.archive_shard(db.shards.key(datetime.now().strftime("%Y-%m-%d")))
+        db.archive_shard(key)
+        assert db.is_archived(key)
+
+        with pytest.raises(ValueError, match="zarchiwizowany"):
+            db.save_tip(make_tip(old))
+        with pytest.raises(ValueError, match="zarchiwizowany"):
+            db.update_result(old_id, "WIN")
+        with pytest.raises(ValueError, match="zarchiwizowany"):
+            db.settle_many([(current_id, "WIN"), (old_id, "WIN")])
+        # Rozliczanie po meczu obejmuje tylko zapisywalne shardy
+        assert db.settle_many([(old, "1:0"), (current, "1:0")]) == 1
+
+        rows = {row.id: row.result for row in db.iter_tips()}
+        assert rows == {old_id: None, current_id: "WIN"}
+        assert db.get_stats(days=400)["total"] == 1
+    finally:
+        db.close()
+
+    reader = Database(db_path, shard_by="month", readonly=True)
+    try:
+        assert sorted(row.id for row in reader.iter_tips()) == sorted([old_id, current_id])
+    finally:
+        reader.close()
+
+
+def test_archived_shard_rejects_tips_moved_from_main(db_path):
+    old = make_match("Inter", "Milan", months_back(3)[-1])
+    db = Database(db_path)
+    try:
+        # Typ sprzed shardow - po przeniesieniu zachowuje stare id (bez numeru sharda)
+        legacy_id = db.save_tip(make_tip(old))
+    finally:
+        db.close()
+
+    db = Database(db_path, shard_by="month")
+    try:
+        db.archive_shard(db.shards.key(old.kickoff.strftime("%Y-%m-%d")))
+        with pytest.raises(ValueError, match="zarchiwizowany"):
+            db.update_result(legacy_id, "WIN")
+        assert [row.result for row in db.iter_tips()] == [None]
+    finally:
+        db.close()
@@ -0,0 +1,100 @@
+"""
+Cache statystyk: trafienia bez zapisow i uniewaznianie po zapisie - przez ten
+sam obiekt Database i (tryb tylko do odczytu) przez inne polaczenie.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from betting_tips_agent import Database
+from conftest import make_match, make_tip
+
+
+def count_queries(db: Database, monkeypatch) -> list:
+    calls = []
+    query = db._query_stats
+    monkeypatch.setattr(db, "_query_stats", lambda *args: calls.append(args) or query(*args))
+    return calls
+
+
+def test_cache_invalidated_by_writes(db_path, monkeypatch):
+    db = Database(db_path)
+    try:
+        calls = count_queries(db, monkeypatch)
+        match = make_match()
+        first = db.save_tip(make_tip(match))
+        assert db.get_stats()["total"] == 0
+        assert db.get_stats()["total"] == 0
+        assert db.get_stats(league="Premier League")["total"] == 0
+        assert len(calls) == 2
+
+        db.update_result(first, "WIN")
+        assert db.get_stats()["wins"] == 1
+        assert db.get_stats_matrix([7, 30])[30]["total"]["wins"] == 1
+        second = db.save_tip(make_tip(match, odds=3.0))
+        db.settle_many([(second, "LOSS")])
+        assert (db.get_stats()["wins"], db.get_stats()["losses"]) == (1, 1)
+        assert db.get_stats_matrix([7, 30])[30]["total"]["losses"] == 1
+        assert {team["team"]: team["total"] for team in db.get_team_stats()} == {"Arsenal": 2, "Chelsea": 2}
+        assert len(calls) == 4
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("shard_by", [None, "month"])
+def test_readonly_cache_invalidated_by_other_connection(db_path, shard_by, monkeypatch):
+    writer = Database(db_path, shard_by=shard_by)
+    tip_id = writer.save_tip(make_tip(make_match()))
+    reader = Database(db_path, shard_by=shard_by, readonly=True)
+    try:
+        calls = count_queries(reader, monkeypatch)
+        assert reader.get_stats()["total"] == 0
+        assert reader.get_stats()["total"] == 0
+        assert len(calls) == 1
+
+        # Zapis przez inny obiekt Database
+        writer.update_result(tip_id, "WIN")
+        assert reader.get_stats()["wins"] == 1
+        assert reader.get_stats()["wins"] == 1
+        assert len(calls) == 2
+
+        # Zapis zwyklym polaczeniem sqlite3 (inny proces)
+        path = writer._shard_path(writer.shard_keys()[0]) if shard_by else db_path
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE tips SET result = 'LOSS', profit = -10 WHERE id = ?", (tip_id,))
+        conn.commit()
+        conn.close()
+        stats = reader.get_stats()
+        assert (stats["wins"], stats["losses"]) == (0, 1)
+        assert len(calls) == 3
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_readonly_cache_with_more_shards_than_attached(db_path, monkeypatch):
+    months = Database.MAX_ATTACHED + 4
+    writer = Database(db_path, shard_by="month")
+    reader = Database(db_path, shard_by="month", readonly=True)
+    try:
+        now = datetime.now()
+        tips = [make_tip(make_match(kickoff=now - timedelta(days=31 * i))) for i in range(months)]
+        ids = writer.save_tips(tips)
+        writer.settle_many((tip_id, "WIN") for tip_id in ids)
+        assert len(writer.shard_keys()) == months
+
+        calls = count_queries(reader, monkeypatch)
+        assert reader.get_stats(days=400)["wins"] == months
+        assert reader.get_stats(days=400)["wins"] == months
+        assert len(calls) == 1
+
+        # Zapis do najstarszego sharda (odlaczonego przez LRU) przez inny obiekt Database
+        writer.update_result(ids[-1], "LOSS")
+        stats = reader.get_stats(days=400)
+        assert (stats["wins"], stats["losses"]) == (months - 1, 1)
+        assert len(calls) == 2
+    finally:
+        reader.close()
+        writer.close()
@@ -0,0 +1,26 @@
+"""TeamTable: forma pakowana w int daje ten sam wynik formy co TeamStats."""
+
+import pytest
+
+from betting_tips_agent import League, TeamStats, TeamTable, decode_form, encode_form
+
+
+@pytest.mark.parametrize("form", [
+    [],
+    ["W", "W", "D", "L", "W"],
+    ["L", "D", "W", "W", "D", "L", "L", "W"],
+    # Litery spoza W/D/L (np. z zewnetrznego zrodla) - 0 pkt jak w form_score
+    ["W", "?", "D", "w", "L"],
+])
+def test_packed_form_score(form):
+    team = TeamStats("Arsenal", form=form)
+    table = TeamTable()
+    view = table.view(table.add(League.PREMIER_LEAGUE, team))
+    assert view.form_score == pytest.approx(team.form_score)
+    assert len(view.form) == len(form)
+
+
+def test_form_roundtrip():
+    form = ["W", "D", "L", "L", "W", "D"]
+    assert decode_form(encode_form(form)) == form
+    assert decode_form(encode_form(["W", "?"])) == ["W", "L"]
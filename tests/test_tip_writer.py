@@ -0,0 +1,30 @@
+"""TipWriter (write-behind): flush czeka na commit przyjetych typow."""
+
+import threading
+
+from betting_tips_agent import Database, TipWriter
+from conftest import make_match, make_tip
+
+
+def test_flush_timeout_while_batch_is_written(db_path):
+    db = Database(db_path)
+    writer = TipWriter(db, batch_size=2)
+    try:
+        save_tips = db.save_tips
+        gate = threading.Event()
+        db.save_tips = lambda tips: gate.wait() and save_tips(tips)
+
+        futures = [writer.submit(make_tip(make_match())) for _ in range(3)]
+        threads = threading.active_count()
+        for _ in range(3):
+            assert writer.flush(timeout=0.01) is False
+        # Przekroczony timeout nie zostawia watkow czekajacych na kolejke
+        assert threading.active_count() == threads
+
+        gate.set()
+        assert writer.flush(timeout=5)
+        assert all(future.done() for future in futures)
+        assert sorted(TipWriter.wait_durable(futures)) == sorted(tip.id for tip in db.iter_tips())
+    finally:
+        writer.close()
+        db.close()